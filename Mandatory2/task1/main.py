@@ -11,7 +11,7 @@ import sys
 import os
 sys.path.append(os.getcwd())
 
-from utils.general_functions import generate_all_data,from_matlab_to_python
+from utils.general_functions import generate_all_data,from_matlab_to_python,convert_matlab_data
 from questions.question1 import run_question1
 from questions.question2 import run_question2
 from questions.question3 import run_question3
@@ -32,8 +32,8 @@ disp = True
 # data: string, if data = 'python', then the script will use python data. Elif, data == 'matlab' the script will use matlab data
 data = 'matlab'
 
-# If you use matlab data, make sure that you converted the data before callling main.py 
-# This can be done using the from_matlab_to_python function in utils.general_functions
+# If you use matlab data, the .mat files of data/matlab/ are converted into numpy objects when calling main.py
+# Only the new or modified files are converted (see convert_matlab_data in utils.general_functions)
 # Note that even if you use matlab data, you should still edit the configuration file with the used matlab parameters
 
 
@@ -66,11 +66,13 @@ thomas.aussagues@imt-atlantique.net\033[0m\n''')
     elif data == 'matlab':
 
         # I placed my matlab data (data_incoherent.mat and data_coherent.mat in data/matlab/) and I convert them into numpy objects
+        # Only the new or modified .mat files are converted (see convert_matlab_data), the other ones are served from the .npy files
 
-        from_matlab_to_python(matlab_file_name='data_incoherent.mat',numpy_file_name='data_incoherent')
-        from_matlab_to_python(matlab_file_name='data_coherent.mat',numpy_file_name='data_coherent')
+        file_names = [('data_incoherent.mat','data_incoherent'),('data_coherent.mat','data_coherent')]
         for SNR in range(-10,11):
-            from_matlab_to_python(matlab_file_name='data_coherent_{}.mat'.format(SNR),numpy_file_name='data_coherent_{}'.format(SNR))
+            file_names.append(('data_coherent_{}.mat'.format(SNR),'data_coherent_{}'.format(SNR)))
+        converted = convert_matlab_data(file_names=file_names)
+        print('{} MATLAB file(s) converted, {} up to date'.format(len(converted),len(file_names)-len(converted)))
 
         print('\n\033[01m\033[31mI am using MATLAB data\033[0m\n')
 
@@ -12,7 +12,7 @@ from utils.standard_DAS import DAS_power_estimate, estimate_classical_spectrum
 from utils.eigenvector import estimate_eigenvector_spectrum
 from utils.music import estimate_music_spectrum
 from utils.min_variance import estimate_minimum_variance_spectrum
-from utils.correlation_matrix_estimation import get_forward_backward_correlation_matrix,get_standard_correlation_matrix_estimation,get_forward_backward_smoothed_spatial_correlation_matrix,get_smoothed_forward_backward_spatial_correlation_matrix,get_smoothed_spatial_correlation_matrix
+from utils.covariance_set import CovarianceSet
 from utils.configuration import get_config_2,get_general_config
 from utils.properties import estimate_DOA
 plt.rcParams.update({
@@ -36,28 +36,29 @@ def assess_music_performances(data:str)->None:
     # Input:
     # data:str, we specify which data we want to use with the string 'data'
 
-    # We get the array output signal X
-    Y = np.load('data/' + data + '/data_coherent.npy')
+    # All the R estimates are derived from the standard one, computed from the (memory mapped) array output signal file
+    covariances = CovarianceSet.from_file(path='data/' + data + '/data_coherent.npy',L=L)
 
     # Standard R estimate
-    standard_correlation_matrix = get_standard_correlation_matrix_estimation(Y=Y)
-    perf_standard_correlation_matrix = get_perf(standard_correlation_matrix)
+    standard_correlation_matrix = covariances['standard']
 
     # Smoothed R estimate
-    smoothed_spatial_correlation_matrix = get_smoothed_spatial_correlation_matrix(Y=Y,L=5)
-    perf_smoothed_spatial_correlation_matrix = get_perf(smoothed_spatial_correlation_matrix)
+    smoothed_spatial_correlation_matrix = covariances['smoothed']
 
     # Forward-backward R estimate
-    forward_backward_spatial_correlation_matrix = get_forward_backward_correlation_matrix(Y=Y)
-    perf_forward_backward_spatial_correlation_matrix = get_perf(forward_backward_spatial_correlation_matrix)
+    forward_backward_spatial_correlation_matrix = covariances['forward_backward']
 
     # Smoothed forward-backward R estimate
-    smoothed_forward_backward_spatial_correlation_matrix = get_smoothed_forward_backward_spatial_correlation_matrix(Y=Y,L=L)
-    perf_smoothed_forward_backward_spatial_correlation_matrix = get_perf(smoothed_forward_backward_spatial_correlation_matrix)
+    smoothed_forward_backward_spatial_correlation_matrix = covariances['smoothed_forward_backward']
 
     # Forward-backward smoothed R estimate
-    forward_backward_smoothed_spatial_correlation_matrix = get_forward_backward_smoothed_spatial_correlation_matrix(Y=Y,L=L)
-    perf_forward_backward_smoothed_spatial_correlation_matrix = get_perf(forward_backward_smoothed_spatial_correlation_matrix)
+    forward_backward_smoothed_spatial_correlation_matrix = covariances['forward_backward_smoothed']
+
+    # We stack the matrices which have the same size (MxM and LxL) to get the performances with batched calls
+    perf_standard_correlation_matrix,perf_forward_backward_spatial_correlation_matrix = get_perf(np.stack((standard_correlation_matrix,
+        forward_backward_spatial_correlation_matrix)))
+    perf_smoothed_spatial_correlation_matrix,perf_smoothed_forward_backward_spatial_correlation_matrix,perf_forward_backward_smoothed_spatial_correlation_matrix = get_perf(np.stack((smoothed_spatial_correlation_matrix,
+        smoothed_forward_backward_spatial_correlation_matrix,forward_backward_smoothed_spatial_correlation_matrix)))
 
 
 
@@ -109,13 +110,21 @@ def assess_music_performances(data:str)->None:
 
   
 
-def get_perf(correlation_matrix)->None:
+def get_perf(correlation_matrix)->dict:
+
+    # This function computes the MUSIC spectrum and its properties (estimated DOA, ML 3dB widths, min level)
+    # Input:
+    # correlation_matrix: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # Output:
+    # dict of properties (see utils.properties.estimate_DOA), or list of K dicts for a stack
 
     # We construct the DOA vector: from -50° to +50°, step 0.25°
     DOA = get_general_config()['DOA_array']
 
     # We get the power spectrum estimate
     music_spectrum_estimate = estimate_music_spectrum(R=correlation_matrix,kd=kd,M=M,Ns=2)
+
+    if music_spectrum_estimate.ndim > 1:
+        return [estimate_DOA(DOA_array=DOA,power_estimate=10*np.log10(spectrum/np.max(spectrum)),Ns=2) for spectrum in music_spectrum_estimate]
     
     return estimate_DOA(DOA_array=DOA,power_estimate=10*np.log10(music_spectrum_estimate/np.max(music_spectrum_estimate)),Ns=2)
-    
\ No newline at end of file
@@ -10,6 +10,7 @@ mpl.rcParams['font.family'] = 'STIXGeneral'
 from cmcrameri import cm
 from utils.standard_DAS import estimate_classical_spectrum
 from utils.configuration import get_config_1
+from utils.subspace import Subspace
 
 plt.rcParams.update({
   "text.usetex": True,
@@ -32,18 +33,11 @@ def run_question3(data:str)->None:
     # Plot the distribution of the eigenvalues of the correlation matrix and explain it on the basis of the signal and noise model.
 
     # First, we make an eigendecomposition of the spatial correlation matrix R.
+    # The Subspace object returns the eigenvalues (real, according to the spectral theorem) and the eigenvectors
+    # sorted in descending order.
 
-    eigenvalues,eigenvectors = np.linalg.eig(R)
-
-    # Again, the eigenvalues which should real (according to the spectral theorem) contain a small (e-17) imaginiary part.
-    # We drop this part by selecting the real part.
-
-    eigenvalues = np.real(eigenvalues)
-
-    # We sort the eigenvectors according to their asscoiated eigenvalues.
-    # np.sort sorts the array in ascending order. We use np.flip to reverse the order.
-    eigenvectors = eigenvectors[np.flip(np.argsort(eigenvalues))]
-    eigenvalues = np.flip(np.sort(eigenvalues))
+    subspace = Subspace(R)
+    eigenvalues = subspace.eigenvalues
 
     # We plot the distribution of the eigenvalues of the correlation matrix
     fig,ax = plt.subplots(1)
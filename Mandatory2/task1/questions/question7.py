@@ -8,10 +8,8 @@ import matplotlib.pyplot as plt
 mpl.rcParams['mathtext.fontset'] = 'stix'
 mpl.rcParams['font.family'] = 'STIXGeneral'
 from cmcrameri import cm
-from utils.eigenvector import estimate_eigenvector_spectrum
-from utils.music import estimate_music_spectrum
 from utils.min_variance import estimate_minimum_variance_spectrum
-from utils.standard_DAS import estimate_classical_spectrum
+from utils.all_spectra import estimate_all_spectra,estimate_subspace_spectra_sweep
 from utils.configuration import get_config_1,get_general_config
 
 plt.rcParams.update({
@@ -45,28 +43,29 @@ def run_question7(data:str)->None:
     
     plt.tight_layout()
     DOA = get_general_config()['DOA_array']
+    Ns_values = [0,1,3,4]
+
+    # We get the EV and MUSIC power spectrum estimates for all the Ns values in one pass (one eigendecomposition)
+    spectra = estimate_subspace_spectra_sweep(R=R,kd=kd,M=M,Ns_values=Ns_values)
+    # We get the MV power spectrum estimate (it does not depend on Ns)
+    minimum_variance_spectrum_estimate = estimate_minimum_variance_spectrum(R=R,kd=kd,M=M)
+    # We normalized it and convert it into dB 
+    minimum_variance_spectrum_estimate = 10*np.log10(minimum_variance_spectrum_estimate/np.max(minimum_variance_spectrum_estimate))
+
     for i in range(4):
-        Ns = [0,1,3,4][i]
+        Ns = Ns_values[i]
         
         fig,ax = plt.subplots(1)
 
-        # We get the EV power spectrum estimate
-        eigenvector_spectrum_estimate = estimate_eigenvector_spectrum(R=R,kd=kd,M=M,Ns=Ns)
-        # We normalized it and convert it into dB 
-        eigenvector_spectrum_estimate = 10*np.log10(eigenvector_spectrum_estimate/np.max(eigenvector_spectrum_estimate))
-        # We get the MUSIC power spectrum estimate
-        music_spectrum_estimate = estimate_music_spectrum(R=R,kd=kd,M=M,Ns=Ns)
-        # We normalized it and convert it into dB 
-        music_spectrum_estimate = 10*np.log10(music_spectrum_estimate/np.max(music_spectrum_estimate))
+        # We normalized the EV power spectrum estimate and convert it into dB 
+        eigenvector_spectrum_estimate = 10*np.log10(spectra['EV'][i]/np.max(spectra['EV'][i]))
+        # We normalized the MUSIC power spectrum estimate and convert it into dB 
+        music_spectrum_estimate = 10*np.log10(spectra['MUSIC'][i]/np.max(spectra['MUSIC'][i]))
 
         ax.plot(DOA,eigenvector_spectrum_estimate,color='k',label='$P_{EV}(a(\\theta))$',linestyle=(0, (3, 1, 1, 1, 1, 1)))
         ax.plot(DOA,music_spectrum_estimate,color='r',label='$P_{MUSIC}(a(\\theta))$',linestyle=(0, (5, 1)))
 
         #if i == 0:
-        # We get the MV power spectrum estimate
-        minimum_variance_spectrum_estimate = estimate_minimum_variance_spectrum(R=R,kd=kd,M=M)
-        # We normalized it and convert it into dB 
-        minimum_variance_spectrum_estimate = 10*np.log10(minimum_variance_spectrum_estimate/np.max(minimum_variance_spectrum_estimate))
         ax.plot(DOA,minimum_variance_spectrum_estimate+0.1,color='green',label='$P_{MV}(a(\\theta))$',linestyle=(0, (5, 1)))
 
 
@@ -96,22 +95,13 @@ def run_question7(data:str)->None:
 
     fig,ax = plt.subplots(1)
 
-    # We get the power spectrum estimate
-    minimum_variance_spectrum_estimate = estimate_minimum_variance_spectrum(R=R,kd=kd,M=M)
-    # We normalized it and convert it into dB 
-    minimum_variance_spectrum_estimate = 10*np.log10(minimum_variance_spectrum_estimate/np.max(minimum_variance_spectrum_estimate))
-    # We get the power spectrum estimate
-    classical_spectrum_estimate = estimate_classical_spectrum(R=R,kd=kd,M=M)
-    # We normalized it and convert it into dB 
-    classical_spectrum_estimate = 10*np.log10(classical_spectrum_estimate/np.max(classical_spectrum_estimate))
-    # We get the power spectrum estimate
-    music_spectrum_estimate = estimate_music_spectrum(R=R,kd=kd,M=M,Ns=2)
-    # We normalized it and convert it into dB 
-    music_spectrum_estimate = 10*np.log10(music_spectrum_estimate/np.max(music_spectrum_estimate))
-    # We get the power spectrum estimate
-    eigenvector_spectrum_estimate = estimate_eigenvector_spectrum(R=R,kd=kd,M=M,Ns=2)
-    # We normalized it and convert it into dB 
-    eigenvector_spectrum_estimate = 10*np.log10(eigenvector_spectrum_estimate/np.max(eigenvector_spectrum_estimate))
+    # We get the four power spectrum estimates in a single pass (one eigendecomposition, one steering matrix)
+    spectra = estimate_all_spectra(R=R,kd=kd,M=M,Ns=2)
+    # We normalized them and convert them into dB 
+    minimum_variance_spectrum_estimate = 10*np.log10(spectra['MV']/np.max(spectra['MV']))
+    classical_spectrum_estimate = 10*np.log10(spectra['DAS']/np.max(spectra['DAS']))
+    music_spectrum_estimate = 10*np.log10(spectra['MUSIC']/np.max(spectra['MUSIC']))
+    eigenvector_spectrum_estimate = 10*np.log10(spectra['EV']/np.max(spectra['EV']))
 
     ax.plot(DOA,classical_spectrum_estimate,color='blue',label='$P_{DAS}(a(\\theta))$',linestyle=(0, (1, 1)))
     ax.plot(DOA,minimum_variance_spectrum_estimate,color='green',label='$P_{MV}(a(\\theta))$',linestyle=(0, (5, 1)))
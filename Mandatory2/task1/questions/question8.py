@@ -8,8 +8,9 @@ import matplotlib.pyplot as plt
 mpl.rcParams['mathtext.fontset'] = 'stix'
 mpl.rcParams['font.family'] = 'STIXGeneral'
 
-from utils.correlation_matrix_estimation import diagonal_loading, get_forward_backward_correlation_matrix, get_rotary_averaged_spatial_correlation_matrix,get_standard_correlation_matrix_estimation,get_forward_backward_smoothed_spatial_correlation_matrix,get_smoothed_forward_backward_spatial_correlation_matrix,get_smoothed_spatial_correlation_matrix
+from utils.covariance_set import CovarianceSet
 from utils.configuration import get_config_2
+from utils.subspace import Subspace
 from utils.plots import plot_matrix_amplitude,plot_matrix_phase,plot_power_estimates
 plt.rcParams.update({
   "text.usetex": True,
@@ -34,10 +35,11 @@ def run_question8(data:str)->None:
     # Input:
     # data:str, we specify which data we want to use with the string 'data'
 
-    # We get the array output signal Y
-    Y = np.load('data/' + data + '/data_coherent.npy')
+    # All the spatial correlation matrix estimates are computed at their first use and cached. The array output
+    # signal Y is read once from the (memory mapped) file, chunk by chunk
+    covariances = CovarianceSet.from_file(path='data/' + data + '/data_coherent.npy',L=L,delta=get_config_2()['delta'])
     # We compute the spatial auto correlation matrix R
-    R = get_standard_correlation_matrix_estimation(Y=Y)
+    R = covariances['standard']
 
 
     # We compute the mateix rank. Since we have coherent sources and 10 sensors, the rank should be 9.
@@ -47,18 +49,11 @@ def run_question8(data:str)->None:
     # Plot the distribution of the eigenvalues of the correlation matrix and explain it on the basis of the signal and noise model.
 
     # First, we make an eigendecomposition of the spatial correlation matrix R.
+    # The Subspace object returns the eigenvalues (real, according to the spectral theorem) and the eigenvectors
+    # sorted in descending order.
 
-    eigenvalues,eigenvectors = np.linalg.eig(R)
-
-    # Again, the eigenvalues which should real (according to the spectral theorem) contain a small (e-17) imaginiary part.
-    # We drop this part by selecting the real part.
-
-    eigenvalues = np.real(eigenvalues)
-
-    # We sort the eigenvectors according to their asscoiated eigenvalues.
-    # np.sort sorts the array in ascending order. We use np.flip to reverse the order.
-    eigenvectors = eigenvectors[np.flip(np.argsort(eigenvalues))]
-    eigenvalues = np.flip(np.sort(eigenvalues))
+    subspace = Subspace(R)
+    eigenvalues = subspace.eigenvalues
 
     # We plot the distribution of the eigenvalues of the correlation matrix
     fig,ax = plt.subplots(1)
@@ -96,73 +91,73 @@ def run_question8(data:str)->None:
 
     # Standard covariance matrix ##########################################################################################    
 
-    plot_matrix_amplitude(matrix=get_standard_correlation_matrix_estimation(Y=Y),
+    plot_matrix_amplitude(matrix=covariances['standard'],
         path='images/question8/matrices/spatial_correlation_matrix_amplitude.pdf',
         title='Spatial correlation matrix amplitude\n')
 
-    plot_matrix_phase(matrix=get_standard_correlation_matrix_estimation(Y=Y),
+    plot_matrix_phase(matrix=covariances['standard'],
         path='images/question8/matrices/spatial_correlation_matrix_phase.pdf',
         title='Spatial correlation matrix phase\n')
 
-    plot_power_estimates(spatial_correlation_matrix=get_standard_correlation_matrix_estimation(Y=Y),
+    plot_power_estimates(spatial_correlation_matrix=covariances['standard'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_standard_correlation_matrix.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n standard correlation matrix')
 
     # Smoothed covariance matrix ###########################################################################################
 
-    plot_matrix_amplitude(matrix=get_smoothed_spatial_correlation_matrix(Y=Y,L=L),
+    plot_matrix_amplitude(matrix=covariances['smoothed'],
         path='images/question8/matrices/smoothed_spatial_correlation_matrix_amplitude.pdf',
         title='Smoothed spatial correlation matrix amplitude\n')
 
-    plot_matrix_phase(matrix=get_smoothed_spatial_correlation_matrix(Y=Y,L=L),
+    plot_matrix_phase(matrix=covariances['smoothed'],
         path='images/question8/matrices/smoothed_spatial_correlation_matrix_phase.pdf',
         title='Smoothed spatial correlation matrix phase\n')
 
-    plot_power_estimates(spatial_correlation_matrix=get_smoothed_spatial_correlation_matrix(Y=Y,L=L),
+    plot_power_estimates(spatial_correlation_matrix=covariances['smoothed'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_smoothed_correlation_matrix.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n smoothed correlation matrix')
 
     # Forward-backward covariance matrix ###################################################################################
 
-    plot_matrix_amplitude(matrix=get_forward_backward_correlation_matrix(Y=Y),
+    plot_matrix_amplitude(matrix=covariances['forward_backward'],
         path='images/question8/matrices/forward_backward_spatial_correlation_matrix_amplitude.pdf',
         title='Forward-backward spatial correlation\nmatrix amplitude')
 
-    plot_matrix_phase(matrix=get_forward_backward_correlation_matrix(Y=Y),
+    plot_matrix_phase(matrix=covariances['forward_backward'],
         path='images/question8/matrices/forward_backward_spatial_correlation_matrix_phase.pdf',
         title='Forward-backward spatial correlation matrix phase\n')
 
 
-    plot_power_estimates(spatial_correlation_matrix=get_forward_backward_correlation_matrix(Y=Y),
+    plot_power_estimates(spatial_correlation_matrix=covariances['forward_backward'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_forward_backward_correlation_matrix.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n forward-backward correlation matrix')
    
     # Smoothed forward-backward covariance matrix ###########################################################################
 
-    plot_matrix_amplitude(matrix=get_smoothed_forward_backward_spatial_correlation_matrix(Y=Y,L=L),
+    plot_matrix_amplitude(matrix=covariances['smoothed_forward_backward'],
         path='images/question8/matrices/smoothed_forward_backward_spatial_correlation_matrix_amplitude.pdf',
         title='Smoothed forward-backward spatial\ncorrelation matrix amplitude')
 
-    plot_matrix_phase(matrix=get_smoothed_forward_backward_spatial_correlation_matrix(Y=Y,L=L),
+    plot_matrix_phase(matrix=covariances['smoothed_forward_backward'],
         path='images/question8/matrices/smoothed_forward_backward_spatial_correlation_matrix_phase.pdf',
         title='Smoothed forward-backward spatial\ncorrelation matrix phase')
     
-    plot_power_estimates(spatial_correlation_matrix=get_smoothed_forward_backward_spatial_correlation_matrix(Y=Y,L=L),
+    plot_power_estimates(spatial_correlation_matrix=covariances['smoothed_forward_backward'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_smoothed_forward_backward_spatial_correlation_matrix.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n smoothed forward-backward spatial correlation_matrix')
 
     # Forward-backward smoothed covariance matrix ###########################################################################
 
-    plot_matrix_amplitude(matrix=get_forward_backward_smoothed_spatial_correlation_matrix(Y=Y,L=L),
+    plot_matrix_amplitude(matrix=covariances['forward_backward_smoothed'],
         path='images/question8/matrices/forward_backward_smoothed_spatial_correlation_matrix_amplitude.pdf',
         title='Forward-backward smoothed spatial\ncorrelation matrix amplitude')
 
-    plot_matrix_phase(matrix=get_forward_backward_smoothed_spatial_correlation_matrix(Y=Y,L=L),
+    plot_matrix_phase(matrix=covariances['forward_backward_smoothed'],
         path='images/question8/matrices/forward_backward_smoothed_spatial_correlation_matrix_phase.pdf',
         title='Forward-backward smoothed spatial\ncorrelation matrix phase')
 
 
-    plot_power_estimates(spatial_correlation_matrix=get_forward_backward_smoothed_spatial_correlation_matrix(Y=Y,L=L),
+    plot_power_estimates(spatial_correlation_matrix=covariances['forward_backward_smoothed'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_forward_backward_smoothed_spatial_correlation_matrix.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n forward-backward smoothed spatial correlation_matrix')
 
@@ -170,30 +165,30 @@ def run_question8(data:str)->None:
     # Diagonaly loaded covariance matrix ###########################################################################
 
 
-    plot_matrix_amplitude(matrix=diagonal_loading(R=get_standard_correlation_matrix_estimation(Y=Y),delta=get_config_2()['delta']),
+    plot_matrix_amplitude(matrix=covariances['diagonally_loaded'],
         path='images/question8/matrices/diagonaly_loaded_spatial_correlation_matrix_amplitude.pdf',
         title='Diagonaly loaded spatial\ncorrelation matrix amplitude')
 
-    plot_matrix_phase(matrix=diagonal_loading(R=get_standard_correlation_matrix_estimation(Y=Y),delta=get_config_2()['delta']),
+    plot_matrix_phase(matrix=covariances['diagonally_loaded'],
         path='images/question8/matrices/diagonaly_loaded_spatial_correlation_matrix_phase.pdf',
         title='Diagonaly loaded spatial\ncorrelation matrix phase')
 
-    plot_power_estimates(spatial_correlation_matrix=diagonal_loading(R=get_standard_correlation_matrix_estimation(Y=Y),delta=get_config_2()['delta']),
+    plot_power_estimates(spatial_correlation_matrix=covariances['diagonally_loaded'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_diagonaly_loaded.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n diagonaly loaded correlation_matrix')
 
     # Rotary averaged covariance matrix ###########################################################################
 
 
-    plot_matrix_amplitude(matrix=get_rotary_averaged_spatial_correlation_matrix(Y=Y),
+    plot_matrix_amplitude(matrix=covariances['rotary_averaged'],
         path='images/question8/matrices/rotary_averaged_spatial_correlation_matrix_amplitude.pdf',
         title='Rotary averaged spatial\ncorrelation matrix amplitude')
 
-    plot_matrix_phase(matrix=get_rotary_averaged_spatial_correlation_matrix(Y=Y),
+    plot_matrix_phase(matrix=covariances['rotary_averaged'],
         path='images/question8/matrices/rotary_averaged_spatial_correlation_matrix_phase.pdf',
         title='Rotary averaged spatial\ncorrelation matrix phase')
 
-    plot_power_estimates(spatial_correlation_matrix=get_rotary_averaged_spatial_correlation_matrix(Y=Y),
+    plot_power_estimates(spatial_correlation_matrix=covariances['rotary_averaged'],
         path='images/question8/spectrums/part_A_question_8_all_spectrums_rotary_averaged.pdf',
         title='DAS, MV, MUSIC and EV spectrums for coherent sources\n rotary averaged correlation_matrix')
 
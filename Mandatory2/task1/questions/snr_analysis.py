@@ -5,17 +5,14 @@
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
-from utils.configuration import get_config_SNR_analysis
-from utils.properties import estimate_DOA
+from utils.snr_dataset import open_snr_dataset
+from utils.adaptive_search import estimate_DOA_adaptive
 mpl.rcParams['mathtext.fontset'] = 'stix'
 mpl.rcParams['font.family'] = 'STIXGeneral'
 from cmcrameri import cm
-from utils.standard_DAS import estimate_classical_spectrum
 from utils.eigenvector import estimate_eigenvector_spectrum
-from utils.music import estimate_music_spectrum
-from utils.min_variance import estimate_minimum_variance_spectrum
-from utils.correlation_matrix_estimation import get_forward_backward_correlation_matrix,get_standard_correlation_matrix_estimation,get_forward_backward_smoothed_spatial_correlation_matrix,get_smoothed_forward_backward_spatial_correlation_matrix,get_smoothed_spatial_correlation_matrix
-from utils.configuration import get_config_2,get_general_config
+from utils.correlation_matrix_estimation import get_forward_backward_correlation_matrix
+from utils.configuration import get_config_2
 plt.rcParams.update({
   "text.usetex": True,
   'font.size': 14
@@ -27,34 +24,26 @@ def analysis(data:str):
     estimated_DOA = []
     mean_error = []
     mean_resolution = []
-    for snr in snr_values:
-      
-        spatial_correlation_matrix = get_forward_backward_correlation_matrix(Y=np.load('data/'+data+'/data_coherent_{}.npy'.format(snr)))
 
-        config = get_config_SNR_analysis(0)
-        kd = config['k']*config['d']
-        M = config['M']
+    # All the realizations of the sweep are read from the (memory mapped) SNR dataset, (re)built from the
+    # data_coherent_{snr}.npy files when they changed (see utils.snr_dataset.open_snr_dataset)
+    dataset = open_snr_dataset(data=data,snr_values=np.arange(-10,10+1,1))
+
+    # We compute the forward-backward spatial correlation matrices of all the SNR values as a (K,M,M) array, with a
+    # single batched call
+    spatial_correlation_matrices = get_forward_backward_correlation_matrix(Y=dataset.get(snr=snr_values,trial=0))
+
+    config = dataset.get_config(0)
+    kd = config['k']*config['d']
+    M = config['M']
+
+
+    for spatial_correlation_matrix in spatial_correlation_matrices:
+
+        # The DOA and the ML 3dB widths are estimated with the coarse-to-fine adaptive search: the spectrum is only
+        # refined around the peaks and their -3dB points, with the resolution of the general configuration grid
+        props = estimate_DOA_adaptive(estimate_eigenvector_spectrum,R=spatial_correlation_matrix,kd=kd,M=M,n_peaks=2,Ns=2)
 
-        # We construct the DOA vector: from -50° to +50°, step 0.25°
-        DOA = get_general_config()['DOA_array']
-        # We get the power spectrum estimate
-        minimum_variance_spectrum_estimate = estimate_minimum_variance_spectrum(R=spatial_correlation_matrix,kd=kd,M=M)
-        # We normalized it and convert it into dB 
-        minimum_variance_spectrum_estimate = 10*np.log10(minimum_variance_spectrum_estimate/np.max(minimum_variance_spectrum_estimate))
-        # We get the power spectrum estimate
-        classical_spectrum_estimate = estimate_classical_spectrum(R=spatial_correlation_matrix,kd=kd,M=M)
-        # We normalized it and convert it into dB 
-        classical_spectrum_estimate = 10*np.log10(classical_spectrum_estimate/np.max(classical_spectrum_estimate))
-        # We get the power spectrum estimate
-        music_spectrum_estimate = estimate_music_spectrum(R=spatial_correlation_matrix,kd=kd,M=M,Ns=2)
-        # We normalized it and convert it into dB 
-        music_spectrum_estimate = 10*np.log10(music_spectrum_estimate/np.max(music_spectrum_estimate))
-        # We get the power spectrum estimate
-        eigenvector_spectrum_estimate = estimate_eigenvector_spectrum(R=spatial_correlation_matrix,kd=kd,M=M,Ns=2)
-        # We normalized it and convert it into dB 
-        eigenvector_spectrum_estimate = 10*np.log10(eigenvector_spectrum_estimate/np.max(eigenvector_spectrum_estimate))
-        props = estimate_DOA(DOA_array=DOA,power_estimate=eigenvector_spectrum_estimate,Ns=2)
-        
         estimated_DOA.append(props['estimated_DOA'])
         mean_error.append(np.mean(np.abs(np.array(props['estimated_DOA'])-np.array([get_config_2()['theta1'],get_config_2()['theta2']]))))
         mean_resolution.append(np.mean(np.array(props['ML_3dB_width'])))
@@ -0,0 +1,172 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the coarse-to-fine adaptive DOA search: instead of evaluating the spectrum on the full fine
+# DOA grid, we evaluate it on a coarse grid, we detect the candidate peaks and we only refine the windows around them
+# and around their -3dB points (such that the ML 3dB widths have the requested resolution too)
+
+import numpy as np
+import scipy.signal
+from utils.configuration import get_general_config
+from utils.properties import estimate_DOA
+
+def estimate_spectrum_adaptive(spectrum_function,R:np.array,kd:float,M:int,n_peaks:int,coarse_step:float=0.5,resolution:float=None,refinement_factor:int=10,**kwargs)->dict:
+
+    # This function estimates the spectrum with the coarse-to-fine adaptive search
+    # Inputs:
+    # spectrum_function: one of estimate_classical_spectrum, estimate_minimum_variance_spectrum, estimate_music_spectrum
+    # or estimate_eigenvector_spectrum (any function taking R, kd, M and DOA_array)
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # n_peaks: int, number of peaks to return (usually the number of sources)
+    # coarse_step: float, step of the coarse DOA grid (in degrees)
+    # resolution: float, requested resolution (in degrees). If None, we use the step of the general configuration grid
+    # refinement_factor: int, the step is divided by this factor at each refinement level
+    # kwargs: other arguments of spectrum_function (e.g. Ns for MUSIC and EV)
+    # Output:
+    # result: dict, with keys
+    #   'estimated_DOA': np.array, the refined peaks positions (in degrees), sorted in ascending order
+    #   'peak_values': np.array, the spectrum values at these peaks
+    #   'DOA_array': np.array, all the DOA where the spectrum was evaluated (sparse grid, sorted in ascending order)
+    #   'power_estimate': np.array, the spectrum on this sparse grid
+    # 'DOA_array' and 'power_estimate' can be used with utils.properties.estimate_DOA (see estimate_DOA_adaptive): the
+    # sparse grid is refined around the peaks and around their -3dB points, elsewhere it is the coarse grid
+
+    # The search range and the default resolution are given by the general configuration grid
+    DOA_array = get_general_config()['DOA_array']
+    DOA_min,DOA_max = np.min(DOA_array),np.max(DOA_array)
+    if resolution is None:
+        resolution = DOA_array[1]-DOA_array[0]
+
+    def evaluate(DOA:np.array)->np.array:
+        return spectrum_function(R=R,kd=kd,M=M,DOA_array=DOA,**kwargs)
+
+    # Coarse grid, within the search range and always ending with its last DOA
+    coarse_DOA = np.arange(DOA_min,DOA_max,coarse_step)
+    if DOA_max-coarse_DOA[-1] > resolution/2:
+        coarse_DOA = np.append(coarse_DOA,DOA_max)
+    evaluated_DOA = [coarse_DOA]
+    evaluated_power = [evaluate(evaluated_DOA[0])]
+
+    # Candidate peaks: we keep a few more peaks than requested since a coarse peak can be a side lobe
+    peaks,_ = scipy.signal.find_peaks(evaluated_power[0])
+    if len(peaks) == 0:
+        peaks = np.array([np.argmax(evaluated_power[0])])
+    peaks = peaks[np.flip(np.argsort(evaluated_power[0][peaks]))][:2*n_peaks]
+    centers = evaluated_DOA[0][peaks]
+    values = evaluated_power[0][peaks]
+
+    # Refinement: at each level, we evaluate the windows [center-step,center+step] of all the candidates at once
+    step = coarse_step
+    while step > resolution:
+        new_step = max(step/refinement_factor,resolution)
+        offsets = np.arange(-step,step+new_step/2,new_step)
+        windows = np.clip(centers[:,np.newaxis]+offsets[np.newaxis,:],DOA_min,DOA_max)
+        power = evaluate(windows.ravel()).reshape(windows.shape)
+        evaluated_DOA.append(windows.ravel())
+        evaluated_power.append(power.ravel())
+        # New centers: the maximum of each window
+        best = np.argmax(power,axis=1)
+        centers = windows[np.arange(len(centers)),best]
+        values = power[np.arange(len(centers)),best]
+        step = new_step
+
+    # Several candidates can converge to the same peak: we keep the highest ones, at least one resolution step apart
+    order = np.flip(np.argsort(values))
+    estimated_DOA = list()
+    peak_values = list()
+    for i in order:
+        if all(np.abs(centers[i]-DOA) > resolution/2 for DOA in estimated_DOA):
+            estimated_DOA.append(centers[i])
+            peak_values.append(values[i])
+        if len(estimated_DOA) == n_peaks:
+            break
+
+    def merge(evaluated_DOA:list,evaluated_power:list)->tuple:
+        # Sparse spectrum: all the evaluated points, sorted and without duplicates (the windows of the different levels
+        # overlap, we round the DOA to merge the points which only differ by floating point errors)
+        DOA = np.round(np.concatenate(evaluated_DOA),decimals=9)
+        DOA,unique_index = np.unique(DOA,return_index=True)
+        return DOA,np.concatenate(evaluated_power)[unique_index]
+
+    # Refinement of the -3dB points (half of the peak power): for each peak and each side, the bracket [last point
+    # above, first point below] of the sparse spectrum is refined until its width is the resolution. The first point
+    # below is then the one found by estimate_DOA on the full grid
+    DOA,power = merge(evaluated_DOA,evaluated_power)
+    brackets = list()
+    thresholds = list()
+    for peak_DOA,peak_value in zip(estimated_DOA,peak_values):
+        peak_index = np.argmin(np.abs(DOA-peak_DOA))
+        threshold = peak_value*10**(-3/10)
+        for direction in (-1,1):
+            index = peak_index
+            while 0 <= index+direction < len(DOA) and power[index] > threshold:
+                index += direction
+            # The spectrum does not go below the threshold before the edge of the search range: nothing to refine
+            if power[index] > threshold:
+                continue
+            brackets.append([DOA[index-direction],DOA[index]])
+            thresholds.append(threshold)
+    brackets = np.array(brackets).reshape(-1,2)
+    thresholds = np.array(thresholds)
+
+    while len(brackets) > 0:
+        widths = np.abs(brackets[:,1]-brackets[:,0])
+        # The brackets which have the resolution are done
+        unresolved = widths > resolution*(1+1e-6)
+        brackets,thresholds,widths = brackets[unresolved],thresholds[unresolved],widths[unresolved]
+        if len(brackets) == 0:
+            break
+        # The steps are multiples of the resolution such that the points stay on the full grid
+        steps = np.maximum(np.round(widths/refinement_factor/resolution),1)*resolution
+        directions = np.sign(brackets[:,1]-brackets[:,0])
+        points = [brackets[i,0]+directions[i]*steps[i]*np.arange(1,np.ceil(widths[i]/steps[i]-1e-6)) for i in range(len(brackets))]
+        power = evaluate(np.concatenate(points))
+        evaluated_DOA.append(np.concatenate(points))
+        evaluated_power.append(power)
+        # New brackets: last point above and first point below the threshold of each bracket
+        start = 0
+        for i in range(len(brackets)):
+            below = np.flatnonzero(power[start:start+len(points[i])] <= thresholds[i])
+            if len(below) == 0:
+                brackets[i,0] = points[i][-1]
+            else:
+                brackets[i,1] = points[i][below[0]]
+                if below[0] > 0:
+                    brackets[i,0] = points[i][below[0]-1]
+            start += len(points[i])
+
+    evaluated_DOA,evaluated_power = merge(evaluated_DOA,evaluated_power)
+
+    result = dict()
+    order = np.argsort(estimated_DOA)
+    result['estimated_DOA'] = np.array(estimated_DOA)[order]
+    result['peak_values'] = np.array(peak_values)[order]
+    result['DOA_array'] = evaluated_DOA
+    result['power_estimate'] = evaluated_power
+
+    return result
+
+def estimate_DOA_adaptive(spectrum_function,R:np.array,kd:float,M:int,n_peaks:int,**kwargs)->dict:
+
+    # This function estimates the DOA and the ML 3dB widths (see utils.properties.estimate_DOA) from the sparse
+    # spectrum of the coarse-to-fine adaptive search, instead of the spectrum on the full grid
+    # Inputs:
+    # spectrum_function: spectrum estimator (see estimate_spectrum_adaptive)
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # n_peaks: int, number of sources (number of peaks given to estimate_DOA)
+    # kwargs: other arguments of estimate_spectrum_adaptive (coarse_step, resolution...) and of spectrum_function
+    # (e.g. Ns for MUSIC and EV)
+    # Output:
+    # props: dict, see utils.properties.estimate_DOA. The min level is the min over the sparse grid (which is mostly
+    # the coarse grid), it can be higher than the min over the full grid
+
+    result = estimate_spectrum_adaptive(spectrum_function,R=R,kd=kd,M=M,n_peaks=n_peaks,**kwargs)
+    # Normalized spectrum in dB, as for the full grid
+    power_estimate = 10*np.log10(result['power_estimate']/np.max(result['power_estimate']))
+
+    return estimate_DOA(DOA_array=result['DOA_array'],power_estimate=power_estimate,Ns=n_peaks)
@@ -0,0 +1,104 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains a function to compute the DAS, MV, MUSIC and EV spectra of the same spatial correlation matrix
+# in a single pass. With R = E@Lambda@E^H and b_i = |e_i^H@a|^2, the four estimators are weighted sums of the b_i:
+# DAS: sum_i lambda_i*b_i/M, MV: 1/sum_i b_i/lambda_i, MUSIC: 1/sum_{i>=Ns} b_i, EV: 1/sum_{i>=Ns} b_i/lambda_i
+# so one eigendecomposition and one projection of the steering matrix are enough for all of them (and for all the Ns).
+
+import numpy as np
+from utils.spectrum_engine import get_DOA_array,get_steering_matrix,get_quadratic_forms
+from utils.precision import get_complex_dtype
+from utils.subspace import Subspace
+from utils.min_variance import MinimumVarianceEstimator
+
+def estimate_all_spectra(R:np.array,kd:float,M:int,Ns:int,DOA_array:np.array=None,subspace:Subspace=None)->dict:
+
+    # This function computes the DAS, MV, MUSIC and EV spectra from shared factors
+    # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices. It can be None if
+    # subspace is given and Hermitian (e.g. Subspace.from_data)
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # Ns: int, number of sources
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here
+    # Output:
+    # spectra: dict, with keys
+    #   'DOA_array': np.array, DOA grid (in degrees)
+    #   'DAS', 'MV', 'MUSIC', 'EV': np.array, angular spectra (same values as estimate_classical_spectrum,
+    #   estimate_minimum_variance_spectrum, estimate_music_spectrum and estimate_eigenvector_spectrum)
+
+    DOA_array = get_DOA_array(DOA_array)
+    # One eigendecomposition...
+    if subspace is None:
+        subspace = Subspace(R)
+    if R is None and not subspace.hermitian:
+        raise ValueError('The DAS and MV spectra of a non Hermitian R are computed from R itself: R cannot be None with a non Hermitian subspace')
+    # Size of R (L for spatial smoothing)
+    size = subspace.eigenvectors.shape[-2]
+    # ...and one steering matrix (with the precision of R)
+    A = get_steering_matrix(DOA_array=DOA_array,kd=kd,M=M,dtype=get_complex_dtype(subspace.eigenvalues))
+
+    # b_i = |e_i^H@a|^2 for all the eigenvectors and all the DOA: (M',n_DOA) array
+    projections = subspace.get_projections(A)
+    eigenvalues = subspace.eigenvalues[...,np.newaxis]
+
+    spectra = dict()
+    spectra['DOA_array'] = DOA_array
+    spectra['MUSIC'] = 1/np.sum(projections[...,Ns:,:],axis=-2)
+    spectra['EV'] = 1/np.sum(projections[...,Ns:,:]/eigenvalues[...,Ns:,:],axis=-2)
+
+    if subspace.hermitian:
+        # The eigenvectors are orthonormal: R = E@Lambda@E^H and R^-1 = E@Lambda^-1@E^H
+        spectra['DAS'] = np.abs(np.sum(eigenvalues*projections,axis=-2))/size
+        spectra['MV'] = 1/np.sum(projections/eigenvalues,axis=-2)
+    else:
+        # The eigenvectors of a non Hermitian R (rotary averaging) are not orthonormal: we use R directly
+        spectra['DAS'] = np.abs(get_quadratic_forms(Q=R,A=A))/size
+        spectra['MV'] = MinimumVarianceEstimator(R).get_power_estimates(A)
+
+    return spectra
+
+def estimate_subspace_spectra_sweep(R:np.array,kd:float,M:int,Ns_values:np.array=None,DOA_array:np.array=None,subspace:Subspace=None)->dict:
+
+    # This function computes the MUSIC and EV spectra for several assumed numbers of sources Ns in one batched pass.
+    # The noise subspaces are nested (the noise subspace for Ns+1 is the one for Ns without e_Ns), so the projections
+    # sum_{i>=Ns} b_i are the reverse cumulative sums of b_i = |e_i^H@a|^2
+    # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # Ns_values: np.array, assumed numbers of sources. If None, we use all the values 0,...,M-1
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here
+    # Output:
+    # spectra: dict, with keys
+    #   'DOA_array': np.array, DOA grid (in degrees)
+    #   'Ns': np.array, assumed numbers of sources
+    #   'MUSIC', 'EV': np.array, (n_Ns,n_DOA) arrays of angular spectra, row i is computed with Ns = spectra['Ns'][i]
+
+    DOA_array = get_DOA_array(DOA_array)
+    if subspace is None:
+        subspace = Subspace(R)
+    A = get_steering_matrix(DOA_array=DOA_array,kd=kd,M=M,dtype=get_complex_dtype(subspace.eigenvalues))
+    if Ns_values is None:
+        Ns_values = np.arange(0,subspace.eigenvalues.shape[-1])
+    Ns_values = np.asarray(Ns_values)
+
+    # b_i = |e_i^H@a|^2 for all the eigenvectors and all the DOA: (M',n_DOA) array
+    projections = subspace.get_projections(A)
+    eigenvalues = subspace.eigenvalues[...,np.newaxis]
+
+    # Reverse cumulative sums: row Ns is sum_{i>=Ns} b_i (and sum_{i>=Ns} b_i/lambda_i)
+    music_projections = np.flip(np.cumsum(np.flip(projections,axis=-2),axis=-2),axis=-2)
+    eigenvector_projections = np.flip(np.cumsum(np.flip(projections/eigenvalues,axis=-2),axis=-2),axis=-2)
+
+    spectra = dict()
+    spectra['DOA_array'] = DOA_array
+    spectra['Ns'] = Ns_values
+    spectra['MUSIC'] = 1/music_projections[...,Ns_values,:]
+    spectra['EV'] = 1/eigenvector_projections[...,Ns_values,:]
+
+    return spectra
@@ -11,6 +11,12 @@ import numpy as np
 
 config = dict()
 config['DOA_array'] = np.arange(-50,50,0.01)
+# Memory cap (in bytes) of the steering matrices cache (see utils.spectrum_engine)
+config['steering_cache_max_bytes'] = 256*1024**2
+# Number of snapshots per chunk for the out-of-core spatial correlation matrix estimation
+config['covariance_chunk_size'] = 2**16
+# Precision of the DOA pipeline: 'double' (complex128/float64) or 'single' (complex64/float32), see utils.precision
+config['precision'] = 'double'
 
 # Questions 1->7: incoherent sources
 
@@ -94,6 +100,9 @@ def get_config_2()->dict:
     return config2
 
 def get_config_SNR_analysis(snr:float)->dict:
-    config2['SNR1'] = snr
-    config2['SNR2'] = snr
-    return config2
\ No newline at end of file
+    # We return a copy of the question 8 configuration: config2 is not modified, so the configurations of several SNR
+    # values can be used at the same time (e.g. by the generation jobs, see utils.generation_jobs)
+    config = dict(config2)
+    config['SNR1'] = snr
+    config['SNR2'] = snr
+    return config
\ No newline at end of file
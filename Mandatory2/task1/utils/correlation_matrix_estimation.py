@@ -5,7 +5,11 @@
 # This script contains functions to compute/estimate the spatial correlation matrix
 
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+from utils.configuration import get_general_config
+from utils.precision import to_precision
 
 def get_forward_backward_smoothed_spatial_correlation_matrix(Y:np.array,L:int)->np.array:
 
@@ -18,11 +22,9 @@ def get_forward_backward_smoothed_spatial_correlation_matrix(Y:np.array,L:int)->
 
     # We get the smoothed spatial correlation matrix
     smoothed_spatial_correlation_matrix = get_smoothed_spatial_correlation_matrix(Y=Y,L=L)
-    # We compute the exchange matrix J
-    J = np.fliplr(np.identity(n=smoothed_spatial_correlation_matrix.shape[0]))
     # We return the forward-backward correlation matrix
 
-    return 1/2*(smoothed_spatial_correlation_matrix+J@smoothed_spatial_correlation_matrix.conj()@J)
+    return forward_backward_average(R=smoothed_spatial_correlation_matrix)
 
 def get_smoothed_forward_backward_spatial_correlation_matrix(Y:np.array,L:int)->np.array:
 
@@ -35,14 +37,9 @@ def get_smoothed_forward_backward_spatial_correlation_matrix(Y:np.array,L:int)->
 
     # We get the forward-backward spatial correlation matrix
     forward_backward_correlation_matrix = get_forward_backward_correlation_matrix(Y=Y)
-    M = forward_backward_correlation_matrix.shape[0]
-    # We return the forward-backward correlation matrix
-
-    smoothed_forward_backward_spatial_correlation_matrix = np.zeros((L,L),dtype='complex')
-    for k in range(M-L):
-        smoothed_forward_backward_spatial_correlation_matrix += forward_backward_correlation_matrix[k:k+L,k:k+L]
+    # We return the smoothed forward-backward correlation matrix
 
-    return 1/(M-L+1)*smoothed_forward_backward_spatial_correlation_matrix
+    return smooth_correlation_matrix(R=forward_backward_correlation_matrix,L=L)
 
 
 def get_forward_backward_correlation_matrix(Y:np.array)->np.array:
@@ -54,11 +51,20 @@ def get_forward_backward_correlation_matrix(Y:np.array)->np.array:
     # np.array, spatial correlation matrix
 
     R = get_standard_correlation_matrix_estimation(Y=Y)
-    # We compute the exchange matrix J
-    J = np.fliplr(np.identity(n=R.shape[0]))
     # We return the forward-backward correlation matrix
     
-    return 1/2*(R+J@R.conj()@J)
+    return forward_backward_average(R=R)
+
+def forward_backward_average(R:np.array)->np.array:
+
+    # This function computes the forward-backward average 1/2*(R+J@R^*@J). J@R^*@J is R^* with the rows and the columns
+    # in reverse order, so we flip the indices instead of building the exchange matrix J and doing two matrix products
+    # Input:
+    # R: np.array, (M,M) spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # Output:
+    # np.array, forward-backward averaged spatial correlation matrix
+
+    return 1/2*(R+R[...,::-1,::-1].conj())
 
 def get_smoothed_spatial_correlation_matrix(Y:np.array,L:int)->np.array:
 
@@ -71,30 +77,111 @@ def get_smoothed_spatial_correlation_matrix(Y:np.array,L:int)->np.array:
 
     # We get the standard correlation matrix estimate
     R = get_standard_correlation_matrix_estimation(Y=Y)
-    # We get the shape of M
-    M = R.shape[0]
-    # We compute the standard correlation matrix
-    R = get_standard_correlation_matrix_estimation(Y)
-    smoothed_covariance_matrix = np.zeros((L,L),dtype='complex')
-    for k in range(M-L):
-        smoothed_covariance_matrix += R[k:k+L,k:k+L]
+    # We return the smoothed spatial correlation matrix
+
+    return smooth_correlation_matrix(R=R,L=L)
+
+def smooth_correlation_matrix(R:np.array,L:int)->np.array:
+
+    # This function averages the M-L+1 LxL diagonal blocks R[k:k+L,k:k+L] of a spatial correlation matrix (the spatial
+    # correlation matrices of the M-L+1 subarrays of L elements). The blocks are the diagonal of a sliding window view
+    # of R (no copy), and the average is one einsum reduction instead of a python loop over the subarrays
+    # Inputs:
+    # R: np.array, (M,M) spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # L: int, number of element in the subarrays
+    # Output:
+    # np.array, (L,L) smoothed spatial correlation matrix, or (K,L,L) stack of smoothed spatial correlation matrices
+
+    M = R.shape[-1]
+    # Window (k,l) of the view is R[k:k+L,l:l+L]: (...,M-L+1,M-L+1,L,L) array
+    windows = np.lib.stride_tricks.sliding_window_view(R,window_shape=(L,L),axis=(-2,-1))
+
+    # The subarrays blocks are the windows (k,k)
+
+    return np.einsum('...kkij->...ij',windows)/(M-L+1)
+
+def get_smoothed_spatial_correlation_matrix_sweep(Y:np.array,L_values:list,forward_backward:bool=False)->dict:
+
+    # This function computes the smoothed spatial correlation matrices for several subarray sizes, from a single
+    # estimate of the full spatial correlation matrix
+    # Inputs:
+    # Y: np.array, (M,N) signal matrix, or (K,M,N) stack of signal matrices
+    # L_values: list, subarray sizes
+    # forward_backward: bool, if True, we smooth the forward-backward correlation matrix
+    # Output:
+    # smoothed_matrices: dict, smoothed_matrices[L] is the (L,L) (or (K,L,L)) smoothed spatial correlation matrix
 
-    return 1/(M-L+1)*smoothed_covariance_matrix
+    if forward_backward:
+        R = get_forward_backward_correlation_matrix(Y=Y)
+    else:
+        R = get_standard_correlation_matrix_estimation(Y=Y)
 
-def get_standard_correlation_matrix_estimation(Y:np.array)->np.array:
+    smoothed_matrices = dict()
+    for L in L_values:
+        smoothed_matrices[L] = smooth_correlation_matrix(R=R,L=L)
+
+    return smoothed_matrices
+
+def get_standard_correlation_matrix_estimation(Y:np.array,precision:str=None)->np.array:
 
     # This function computes and returns the standard correlation matrix estimate
     # Inputs:
     # Y: np.array, signal matrix
+    # precision: str, 'double' or 'single' (see utils.precision). If None, we use the precision of the general configuration
     # Output:
     # R: np.array, spatial correlation matrix
 
-    # We compute the spatial auto correlation matrix R
-    R = Y@Y.conj().T/Y.shape[1]
+    # We cast the signal matrix to the requested precision (no copy if it already has it)
+    Y = to_precision(Y,precision=precision)
+    # We compute the spatial auto correlation matrix R (swapaxes instead of .T such that stacks of signal matrices work)
+    R = Y@np.swapaxes(Y,-1,-2).conj()/Y.shape[-1]
     # We return it
 
     return R
 
+def get_standard_correlation_matrix_estimation_from_file(path:str,chunk_size:int=None,n_workers:int=None,precision:str=None)->np.array:
+
+    # This function computes the standard correlation matrix estimate of a signal matrix stored in a .npy file, without
+    # loading it in memory: the file is memory mapped and Y@Y^H is accumulated over chunks of snapshots. The snapshots
+    # are split into n_workers contiguous spans, each thread accumulates its own partial sum over its span (numpy
+    # releases the GIL during the products) and the partial sums are merged at the end. The memory footprint is about
+    # n_workers*(M*chunk_size+M^2) complex numbers, whatever the number of snapshots
+    # Inputs:
+    # path: str, path of the .npy file containing the (M,N) signal matrix
+    # chunk_size: int, number of snapshots per chunk. If None, we use the value of the general configuration
+    # n_workers: int, number of threads. If None, we use the number of CPUs
+    # precision: str, 'double' or 'single' (see utils.precision). If None, we use the precision of the general configuration.
+    # In single precision, the chunk products are computed in complex64 but the partial sums are accumulated in
+    # complex128, such that the rounding errors do not grow with the number of chunks
+    # Output:
+    # R: np.array, spatial correlation matrix
+
+    if chunk_size is None:
+        chunk_size = get_general_config()['covariance_chunk_size']
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    Y = np.load(path,mmap_mode='r')
+    M,N = Y.shape
+    # Contiguous span of snapshots of each thread (at least one chunk per thread)
+    n_workers = max(1,min(n_workers,-(-N//chunk_size)))
+    bounds = np.linspace(0,N,n_workers+1).astype(int)
+
+    def accumulate(start:int,stop:int)->np.array:
+        partial_sum = np.zeros((M,M),dtype=complex)
+        for k in range(start,stop,chunk_size):
+            # Only this chunk is read from the file
+            chunk = to_precision(Y[:,k:min(k+chunk_size,stop)],precision=precision)
+            partial_sum += chunk@chunk.conj().T
+        return partial_sum
+
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        partial_sums = list(executor.map(accumulate,bounds[:-1],bounds[1:]))
+
+    # We merge the partial sums
+
+    return to_precision(np.sum(partial_sums,axis=0)/N,precision=precision)
+
 
 def get_rotary_averaged_spatial_correlation_matrix(Y:np.array)->np.array:
 
@@ -105,15 +192,24 @@ def get_rotary_averaged_spatial_correlation_matrix(Y:np.array)->np.array:
     # R_ra: np.array, rotary averaged spatial correlation matrix
 
     # We compute the spatial auto correlation matrix R
-    R = Y@Y.conj().T/Y.shape[1]
-    # We compute the exchange matrix J
-    J = np.fliplr(np.identity(n=R.shape[0]))
+    R = get_standard_correlation_matrix_estimation(Y=Y)
     # We compute the rotary averaged spatial correlation matrix
-    R_ra = 1/4 * (R+J@R.T+J@R@J+R@J)
+    R_ra = rotary_average(R=R)
     # We return it
 
     return R_ra
 
+def rotary_average(R:np.array)->np.array:
+
+    # This function computes the rotary average 1/4*(R+J@R^T+J@R@J+R@J) with index flips instead of products with the
+    # exchange matrix J (J@X flips the rows of X, X@J flips its columns)
+    # Input:
+    # R: np.array, (M,M) spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # Output:
+    # np.array, rotary averaged spatial correlation matrix
+
+    return 1/4*(R+np.swapaxes(R,-1,-2)[...,::-1,:]+R[...,::-1,::-1]+R[...,:,::-1])
+
 def diagonal_loading(R:np.array,delta:float):
 
     # This function computes and returns the diagonaly reduced spatial correlation matrix
@@ -121,7 +217,7 @@ def diagonal_loading(R:np.array,delta:float):
     # R: np.array, spatial correlation matrix
     # Output:
     # R -delta*I_M: np.array, the diagonaly reduced spatial correlation matrix
-    return R - delta * np.identity(R.shape[0])
+    return R - delta * np.identity(R.shape[-1],dtype=R.dtype)
 
 
 
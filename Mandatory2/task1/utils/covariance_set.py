@@ -0,0 +1,115 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the CovarianceSet class: all the spatial correlation matrix estimates of one signal matrix,
+# computed lazily (at the first access) and cached. The variants are derived from each other, so Y is only read once
+
+import numpy as np
+from utils.correlation_matrix_estimation import get_standard_correlation_matrix_estimation,get_standard_correlation_matrix_estimation_from_file,forward_backward_average,rotary_average,smooth_correlation_matrix,diagonal_loading
+
+class CovarianceSet:
+
+    # This class computes and caches the spatial correlation matrix estimates of a signal matrix Y
+    # Attributes:
+    # Y: np.array, signal matrix (None if the set was built from a file)
+    # L: int, number of element in the subarrays (spatial smoothing)
+    # delta: float, diagonal loading value
+    # precision: str, 'double' or 'single' (see utils.precision), None for the precision of the general configuration
+    # matrices: dict, cached (read-only) estimates, keyed by variant name
+
+    # Available variants and how each of them is derived from another one
+    # standard -> forward_backward, smoothed, rotary_averaged, diagonally_loaded
+    # forward_backward -> smoothed_forward_backward (smoothing of the FB estimate)
+    # smoothed -> forward_backward_smoothed (FB average of the smoothed estimate)
+    variants = ('standard','smoothed','forward_backward','smoothed_forward_backward','forward_backward_smoothed','rotary_averaged','diagonally_loaded')
+
+    def __init__(self,Y:np.array,L:int=None,delta:float=None,precision:str=None)->None:
+
+        # Inputs:
+        # Y: np.array, signal matrix
+        # L: int, number of element in the subarrays, needed by the smoothed variants
+        # delta: float, diagonal loading value, needed by the diagonally loaded variant
+        # precision: str, 'double' or 'single' (see utils.precision). If None, we use the precision of the general
+        # configuration. All the variants have the precision of the standard estimate
+
+        self.Y = Y
+        self.L = L
+        self.delta = delta
+        self.precision = precision
+        self.matrices = dict()
+
+    @classmethod
+    def from_file(cls,path:str,L:int=None,delta:float=None,chunk_size:int=None,n_workers:int=None,precision:str=None):
+
+        # This function builds the set from a .npy file without loading the signal matrix in memory: the standard
+        # estimate is accumulated out-of-core (see get_standard_correlation_matrix_estimation_from_file) and all the
+        # other variants are derived from it
+        # Inputs:
+        # path: str, path of the .npy file containing the signal matrix
+        # L: int, number of element in the subarrays, needed by the smoothed variants
+        # delta: float, diagonal loading value, needed by the diagonally loaded variant
+        # chunk_size: int, number of snapshots per chunk. If None, we use the value of the general configuration
+        # n_workers: int, number of threads. If None, we use the number of CPUs
+        # precision: str, 'double' or 'single' (see utils.precision). If None, we use the precision of the general configuration
+        # Output:
+        # CovarianceSet
+
+        covariances = cls(Y=None,L=L,delta=delta,precision=precision)
+        R = get_standard_correlation_matrix_estimation_from_file(path=path,chunk_size=chunk_size,n_workers=n_workers,precision=precision)
+        R.flags.writeable = False
+        covariances.matrices['standard'] = R
+
+        return covariances
+
+    def get(self,variant:str)->np.array:
+
+        # This function returns a spatial correlation matrix estimate, computed only at the first access
+        # Input:
+        # variant: str, one of CovarianceSet.variants
+        # Output:
+        # np.array, read-only spatial correlation matrix estimate
+
+        if variant not in self.matrices:
+            if variant not in self.variants:
+                raise ValueError('Unknown variant {}, the available variants are {}'.format(variant,self.variants))
+            if 'smoothed' in variant and self.L is None:
+                raise ValueError('The {} variant needs the number of element in the subarrays L, the set was built with L = None'.format(variant))
+            if variant == 'diagonally_loaded' and self.delta is None:
+                raise ValueError('The diagonally_loaded variant needs the diagonal loading value delta, the set was built with delta = None')
+            R = self.compute(variant=variant)
+            # The cached matrices are shared by all the users of the set: they must not be modified in place
+            R.flags.writeable = False
+            self.matrices[variant] = R
+
+        return self.matrices[variant]
+
+    def compute(self,variant:str)->np.array:
+
+        # This function computes a spatial correlation matrix estimate from the cached estimate it is derived from
+        # Input:
+        # variant: str, one of CovarianceSet.variants
+        # Output:
+        # np.array, spatial correlation matrix estimate
+
+        if variant == 'standard':
+            # The only pass over Y
+            return get_standard_correlation_matrix_estimation(Y=self.Y,precision=self.precision)
+        if variant == 'forward_backward':
+            return forward_backward_average(R=self.get('standard'))
+        if variant == 'smoothed':
+            return smooth_correlation_matrix(R=self.get('standard'),L=self.L)
+        if variant == 'smoothed_forward_backward':
+            return smooth_correlation_matrix(R=self.get('forward_backward'),L=self.L)
+        if variant == 'forward_backward_smoothed':
+            return forward_backward_average(R=self.get('smoothed'))
+        if variant == 'rotary_averaged':
+            return rotary_average(R=self.get('standard'))
+
+        return diagonal_loading(R=self.get('standard'),delta=self.delta)
+
+    def __getitem__(self,variant:str)->np.array:
+
+        # CovarianceSet(Y)['smoothed'] is the same as CovarianceSet(Y).get('smoothed')
+
+        return self.get(variant=variant)
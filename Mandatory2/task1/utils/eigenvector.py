@@ -8,6 +8,9 @@
 import numpy as np
 from utils.general_functions import get_steering_vector
 from utils.configuration import get_general_config
+from utils.spectrum_engine import get_DOA_array,get_steering_matrix,evaluate_spectrum_fft
+from utils.precision import get_complex_dtype
+from utils.subspace import Subspace
 
 def estimate_eigenvector_power(R:np.array,a:np.array,Ns:int)->float:
 
@@ -53,10 +56,60 @@ def estimate_eigenvector_power(R:np.array,a:np.array,Ns:int)->float:
     return float(np.real(1/(a.conj().T@eigenvectors@big_lambda_inverse@eigenvectors.conj().T@a)))
 
 
-def estimate_eigenvector_spectrum(R:np.array,kd:float,M:int,Ns:int)->np.array:
+def estimate_eigenvector_spectrum(R:np.array,kd:float,M:int,Ns:int,DOA_array:np.array=None,subspace:Subspace=None)->np.array:
 
     # This function computes and returns the spectrum (for angles in [-40,50] degrees) using the EV method
     # Inputs
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # Ns: int, number of sources
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here (once for all the DOA)
+    # (Subspace.from_data(Y) or a utils.subspace_tracking.SubspaceTracker can also be given, R is then not used)
+    # Output:
+    # np.array, angular spectrum, or (K,n_DOA) array of angular spectra for a stack
+
+    # We get the eigendecomposition of R
+    if subspace is None:
+        subspace = Subspace(R)
+    # We compute the steering matrix for all the DOA at once
+    A = get_steering_matrix(DOA_array=get_DOA_array(DOA_array),kd=kd,M=M,dtype=get_complex_dtype(subspace.eigenvalues))
+    # We return the power estimates 1/(a^H@En@Lambda^-1@En^H@a) (see estimate_eigenvector_power)
+
+    return 1/subspace.get_eigenvector_projections(A=A,Ns=Ns)
+
+
+def estimate_eigenvector_spectrum_fft(R:np.array,kd:float,M:int,Ns:int,n_fft:int=2**14,DOA_array:np.array=None,interpolate:bool=True,subspace:Subspace=None)->tuple:
+
+    # This function computes the EV spectrum of a ULA with the FFT (see utils.spectrum_engine.evaluate_spectrum_fft)
+    # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # Ns: int, number of sources
+    # n_fft: int, FFT size
+    # DOA_array: np.array, DOA grid (in degrees) used if interpolate is True. If None, we use the grid of the general configuration
+    # interpolate: bool, if True, the spectrum is interpolated onto the DOA grid. Else, it is given on a uniform sin(DOA) grid
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here
+    # Outputs:
+    # DOA_array: np.array, DOA (in degrees)
+    # np.array, angular spectrum, or (K,n_DOA) array of angular spectra for a stack
+
+    if subspace is None:
+        subspace = Subspace(R)
+    eigenvalues,eigenvectors = subspace.get_noise_subspace(Ns=Ns)
+    # The coefficients of a^H@En@Lambda^-1@En^H@a are the diagonal sums of En@Lambda^-1@En^H
+    Q = (eigenvectors/eigenvalues[...,np.newaxis,:])@np.swapaxes(eigenvectors,-1,-2).conj()
+    DOA_array,spectrum = evaluate_spectrum_fft(Q=Q,kd=kd,n_fft=n_fft,DOA_array=DOA_array,interpolate=interpolate,transform=lambda values: np.real(1/values))
+
+    return DOA_array,spectrum
+
+
+def estimate_eigenvector_spectrum_reference(R:np.array,kd:float,M:int,Ns:int)->np.array:
+
+    # This function is the per-DOA reference implementation of estimate_eigenvector_spectrum
+    # Inputs
     # R: np.array, spatial correlation matrix
     # kd: float, product of the wavenumber k with the element distance d
     # M: int, number of sensors
@@ -64,7 +117,6 @@ def estimate_eigenvector_spectrum(R:np.array,kd:float,M:int,Ns:int)->np.array:
     # Output:
     # np.array, angular spectrum
 
-    
     # This function estimates the spectrum using the eigenvector method
     # eigenvector_spectrum : list storing the power estimates for different DOA values
     eigenvector_spectrum = list()
@@ -0,0 +1,78 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains functions to estimate the DOA with the ESPRIT method (least squares and total least squares).
+# For a ULA, the subarrays made of the M-1 first and of the M-1 last sensors are shifted by one element spacing:
+# their steering matrices satisfy A2 = A1@diag(exp(1j*kd*sin(DOA))). The signal subspace inherits this rotational
+# invariance, so the DOA are given by the eigenvalues of a small Ns x Ns matrix, without any spectrum evaluation.
+
+import numpy as np
+from utils.subspace import Subspace
+
+def get_DOA_from_rotation(Phi:np.array,kd:float)->np.array:
+
+    # This function computes the DOA from the rotation operator Phi
+    # Inputs:
+    # Phi: np.array, (Ns,Ns) rotation operator
+    # kd: float, product of the wavenumber k with the element distance d
+    # Output:
+    # np.array, the Ns estimated DOA (in degrees), sorted in ascending order
+
+    # The eigenvalues of Phi are exp(1j*kd*sin(DOA))
+    z = np.linalg.eigvals(Phi)
+    sin_DOA = np.clip(np.angle(z)/kd,-1,1)
+
+    return np.sort(np.arcsin(sin_DOA)*180/np.pi)
+
+def estimate_esprit_DOA(R:np.array,kd:float,Ns:int,subspace:Subspace=None)->np.array:
+
+    # This function estimates the DOA with the (least squares) ESPRIT method
+    # Inputs:
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # Ns: int, number of sources
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here
+    # Output:
+    # np.array, the Ns estimated DOA (in degrees), sorted in ascending order
+
+    # We get the signal subspace (same eigendecomposition as MUSIC)
+    if subspace is None:
+        subspace = Subspace(R)
+    _,eigenvectors = subspace.get_signal_subspace(Ns=Ns)
+
+    # Signal subspaces of the two shifted subarrays
+    E1 = eigenvectors[:-1]
+    E2 = eigenvectors[1:]
+    # Least squares solution of E1@Phi = E2
+    Phi = np.linalg.lstsq(E1,E2,rcond=None)[0]
+
+    return get_DOA_from_rotation(Phi=Phi,kd=kd)
+
+def estimate_tls_esprit_DOA(R:np.array,kd:float,Ns:int,subspace:Subspace=None)->np.array:
+
+    # This function estimates the DOA with the total least squares ESPRIT method (TLS-ESPRIT)
+    # Inputs:
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # Ns: int, number of sources
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here
+    # Output:
+    # np.array, the Ns estimated DOA (in degrees), sorted in ascending order
+
+    # We get the signal subspace (same eigendecomposition as MUSIC)
+    if subspace is None:
+        subspace = Subspace(R)
+    _,eigenvectors = subspace.get_signal_subspace(Ns=Ns)
+
+    # Signal subspaces of the two shifted subarrays, side by side: (M-1,2Ns) matrix
+    E12 = np.concatenate((eigenvectors[:-1],eigenvectors[1:]),axis=1)
+    # Right singular vectors of [E1 E2], partitioned in Ns x Ns blocks
+    _,_,Vh = np.linalg.svd(E12)
+    V = Vh.conj().T
+    V12 = V[:Ns,Ns:]
+    V22 = V[Ns:,Ns:]
+    # TLS solution: Phi = -V12@V22^-1
+    Phi = -V12@np.linalg.inv(V22)
+
+    return get_DOA_from_rotation(Phi=Phi,kd=kd)
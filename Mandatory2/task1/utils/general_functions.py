@@ -6,11 +6,13 @@
 
 import sys
 import os
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.getcwd()+'/utils')
 import numpy as np
 import scipy.io 
-from generate_data import generate_data
-from configuration import get_config_1,get_config_2,get_config_SNR_analysis
+from utils.generation_jobs import get_generation_jobs,run_generation_jobs
 
 
 
@@ -47,21 +49,85 @@ def from_matlab_to_python(matlab_file_name:str,numpy_file_name:str)->None:
 
     return None
 
+def get_file_hash(path:str)->str:
+
+    # This function computes the sha256 hash of a file content, reading it by blocks
+    # Input:
+    # path: str, file path
+    # Output:
+    # str, hexadecimal sha256 hash
+
+    file_hash = hashlib.sha256()
+    with open(path,'rb') as file:
+        for block in iter(lambda: file.read(2**20),b''):
+            file_hash.update(block)
+
+    return file_hash.hexdigest()
+
+def convert_matlab_data(file_names:list,directory:str='data/matlab/',n_workers:int=None)->list:
+
+    # This function converts MATLAB signal files into numpy objects (see from_matlab_to_python), only when needed.
+    # A manifest (conversion_manifest.json in the directory) records the size, the modification time and the sha256
+    # hash of each converted .mat file:
+    # - same size and modification time as in the manifest and the .npy file exists: the file is skipped without
+    #   being read (a warm start does no MATLAB I/O at all)
+    # - else, the content hash is computed: if it did not change (e.g. the file was only touched), the manifest is
+    #   updated without conversion. Else, the file is stale and it is converted
+    # The stale files are converted in parallel threads
+    # Inputs:
+    # file_names: list, (matlab_file_name,numpy_file_name) tuples (see from_matlab_to_python)
+    # directory: str, folder containing the .mat files and the .npy files
+    # n_workers: int, number of threads. If None, we use the number of CPUs
+    # Output:
+    # converted: list, names of the converted MATLAB files
+
+    manifest_path = os.path.join(directory,'conversion_manifest.json')
+    manifest = dict()
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+    stale = list()
+    for matlab_file_name,numpy_file_name in file_names:
+        matlab_path = os.path.join(directory,matlab_file_name)
+        numpy_path = os.path.join(directory,numpy_file_name+'.npy')
+        status = os.stat(matlab_path)
+        entry = manifest.get(matlab_file_name)
+        up_to_date = entry is not None and entry['numpy_file_name'] == numpy_file_name and os.path.exists(numpy_path)
+        if up_to_date and entry['size'] == status.st_size and entry['mtime_ns'] == status.st_mtime_ns:
+            continue
+        new_entry = {'numpy_file_name':numpy_file_name,'size':status.st_size,'mtime_ns':status.st_mtime_ns,'sha256':get_file_hash(matlab_path)}
+        if not (up_to_date and entry['sha256'] == new_entry['sha256']):
+            stale.append((matlab_file_name,numpy_file_name))
+        manifest[matlab_file_name] = new_entry
+
+    def convert(file_name:tuple)->None:
+        matlab_file_name,numpy_file_name = file_name
+        x = scipy.io.loadmat(os.path.join(directory,matlab_file_name))['x']
+        np.save(os.path.join(directory,numpy_file_name),x)
+        return None
+
+    if stale:
+        with ThreadPoolExecutor(max_workers=n_workers or os.cpu_count() or 1) as executor:
+            list(executor.map(convert,stale))
+
+    # The manifest is written once all the conversions succeeded (and atomically, such that an interrupted run
+    # cannot leave a corrupted manifest)
+    temporary_path = manifest_path+'.tmp'
+    with open(temporary_path,'w') as file:
+        json.dump(manifest,file,indent=2,sort_keys=True)
+    os.replace(temporary_path,manifest_path)
+
+    return [matlab_file_name for matlab_file_name,_ in stale]
+
 def generate_all_data()->None:
 
     # This functions generate all data for all experiences
+    # The datasets (incoherent, coherent and SNR analysis) are generated in parallel processes, see utils.generation_jobs
 
     # Input: None
     # Output: None
 
-    # Question 1->7: incoherent sources
-    generate_data(name='data_incoherent',config=get_config_1())
-    # Question 8: coherent sources
-    generate_data(name='data_coherent',config=get_config_2())
-    # SNR analysis
-
-    snr_values = np.arange(-10,10+1,1)
-    for snr in snr_values:
-        generate_data(name='data_coherent_{}'.format(snr),config=get_config_SNR_analysis(snr))
+    run_generation_jobs(jobs=get_generation_jobs())
 
     return None
@@ -14,12 +14,36 @@
 # 12. Dec 1997 Added random phase noise to signals to better ensure incoherence
 
 import numpy as np
+from utils.precision import get_dtypes,to_precision
 
 
-def generate_data(name:str,config:dict) -> None :
+def generate_data(name:str,config:dict,precision:str=None) -> None :
 
-    # We fix the numpy seed to ensure that all sources are subject to the same noise
-    np.random.seed(config['seed'])
+    # This function generates a signal matrix (see get_data) and saves it in data/python/
+    # precision: str, 'double' or 'single' precision of the saved signal (see utils.precision). If None, we use the
+    # precision of the general configuration
+
+    x = get_data(config=config,precision=precision)
+
+    print('The output signal has been save in: data/\n')
+    
+    
+    np.save('data/python/'+name,x)
+
+    return None
+
+def get_data(config:dict,seed:int=None,precision:str=None,verbose:bool=True) -> np.array :
+
+    # This function generates and returns a signal matrix. The random numbers are drawn from a generator local to the
+    # call (np.random.RandomState(seed) gives the same numbers as np.random.seed(seed)), so several calls can run
+    # concurrently (e.g. in a process pool, see utils.generation_jobs) without sharing the global numpy state
+    # seed: int, seed of the generator. If None, we use config['seed']
+    # precision: str, 'double' or 'single' precision of the signal (see utils.precision). If None, we use the
+    # precision of the general configuration
+    # verbose: bool, if true the sources parameters are printed
+
+    # We fix the seed to ensure that all sources are subject to the same noise
+    rng = np.random.RandomState(config['seed'] if seed is None else seed)
     # Number of time samples
     N = config['N']
     # number of sensors
@@ -54,7 +78,7 @@ def generate_data(name:str,config:dict) -> None :
     # We generate a complex AWGN (spatially white) with variance (1 or 2)
     variance = config['variance']  
     # Here, we assume that the real and imaginary parts of the noise are independent...                  
-    noise = np.random.randn(M,N) + 1j*np.random.randn(M,N)
+    noise = rng.randn(M,N) + 1j*rng.randn(M,N)
     
     # We compute both sources amplitudes...
     amp1 = np.sqrt(2)*10**(SNR1/20)   
@@ -72,8 +96,8 @@ def generate_data(name:str,config:dict) -> None :
     #phase1 = 1j*2*np.pi*np.random.normal(loc=0,scale=1,size=(N,1))
     #phase2 = 1j*2*np.pi*np.random.normal(loc=0,scale=1,size=(N,1))
 
-    phase1 = 1j*2*np.pi*np.random.rand(N,1)
-    phase2 = 1j*2*np.pi*np.random.rand(N,1)
+    phase1 = 1j*2*np.pi*rng.rand(N,1)
+    phase2 = 1j*2*np.pi*rng.rand(N,1)
 
     signal1 = amp1*np.exp(phase1)*np.power(np.exp(1j*omega1*T),np.arange(0,N)[:,np.newaxis])
 
@@ -85,6 +109,11 @@ def generate_data(name:str,config:dict) -> None :
     s = np.concatenate((signal1,signal2),axis=1).T
     
     x = A@s + noise
+    # We cast the output signal to the requested precision
+    x = to_precision(x,precision=precision)
+
+    if not verbose:
+        return x
 
     print('\n')
     print('-'*90)
@@ -120,11 +149,136 @@ def generate_data(name:str,config:dict) -> None :
     #else :
       #print('A does not have full rank')
 
-    print('The output signal has been save in: data/\n')
-    
+    return x
+
     
-    np.save('data/python/'+name,x)
 
-    return None
+def get_scenario(config:dict) -> dict :
+
+    # This function converts a two sources configuration dictionary (see utils.configuration) into a scenario
+    # dictionary for simulate_sources: ULA with element spacing d, one coherence group if the sources are coherent
+    # Input:
+    # config: dict, configuration dictionary
+    # Output:
+    # scenario: dict, scenario dictionary
+
+    scenario = dict()
+    scenario['N'] = config['N']
+    scenario['T'] = config['T']
+    scenario['k'] = config['k']
+    scenario['seed'] = config['seed']
+    scenario['positions'] = config['d']*np.arange(0,config['M'])
+    scenario['SNR'] = np.array([config['SNR1'],config['SNR2']])
+    scenario['theta'] = np.array([config['theta1'],config['theta2']])
+    scenario['omega'] = np.array([config['omega1'],config['omega2']])
+    scenario['gamma'] = np.array([0,config['gamma']])
+    scenario['group'] = np.array([0,0]) if config['coherent'] else np.array([0,1])
+
+    return scenario
+
+
+def get_array_steering_matrix(positions:np.array,theta:np.array,k:float,elevation:np.array=None) -> np.array :
+
+    # This function computes the steering matrix of an arbitrary array for several DOA with one broadcasted operation
+    # Inputs:
+    # positions: np.array, (M,) element positions along the array axis (linear array), (M,2) element positions
+    # (x along the array axis, y along the broadside direction) for a planar array or (M,3) element positions (x, y and
+    # z, normal to the plane of the first two axes) for a volumetric array
+    # theta: np.array, (K,) directions of arrival in degrees (azimuth, 0 degrees is normal incidence)
+    # k: float, wavenumber
+    # elevation: np.array, (K,) elevations of the sources in degrees (angle with the x-y plane). If None, the sources
+    # are in the x-y plane
+    # Output:
+    # A: np.array, (M,K) steering matrix. For a ULA (positions = d*m), column i is get_steering_vector(theta[i],k*d,M)
+
+    positions = np.asarray(positions,dtype=float)
+    theta = np.asarray(theta,dtype=float)*np.pi/180
+    elevation = np.zeros_like(theta) if elevation is None else np.asarray(elevation,dtype=float)*np.pi/180
+    if positions.ndim == 1:
+        positions = positions[:,np.newaxis]
+    if positions.ndim != 2 or positions.shape[1] > 3:
+        raise ValueError('The element positions must have the shape (M,), (M,2) or (M,3), got {}'.format(positions.shape))
+    # Unit vectors of the DOA: (D,K), sin(theta) along the array axis, cos(theta) along the broadside direction (both
+    # scaled by cos(elevation)) and sin(elevation) along z. The missing axes of a linear or planar array are 0
+    directions = np.stack((np.sin(theta)*np.cos(elevation),np.cos(theta)*np.cos(elevation),np.sin(elevation)))[:positions.shape[1]]
+
+    return np.exp(1j*k*positions@directions)
+
+
+def simulate_sources(scenario:dict,n_trials:int,seed=None,precision:str=None) -> np.array :
+
+    # This function generates n_trials realizations of K narrowband sources received by an arbitrary array, in one
+    # vectorized call (no printing, no global seed). Source i has the amplitude sqrt(2)*10^(SNR_i/20), the pulsation
+    # omega_i, the relative phase gamma_i and a random phase (uniform in [0,2*pi) at each time sample) shared by all
+    # the sources of its coherence group. The noise is the complex AWGN of generate_data. Each trial gets its own random
+    # stream, spawned from one np.random.SeedSequence (see generate_data_batch)
+    # Inputs:
+    # scenario: dict, with keys
+    #   'N': int, number of time samples
+    #   'T': float, time sampling interval
+    #   'k': float, wavenumber
+    #   'seed': int, root seed (used if seed is None)
+    #   'positions': np.array, (M,), (M,2) or (M,3) element positions (see get_array_steering_matrix)
+    #   'elevation': np.array, optional, (K,) elevations of the sources in degrees (see get_array_steering_matrix)
+    #   'SNR', 'theta', 'omega', 'gamma': np.array, (K,) SNR (in dB), DOA (in degrees), pulsations and relative phases
+    #   (in degrees) of the sources
+    #   'group': np.array, (K,) coherence group of each source (coherent sources share the same group)
+    # n_trials: int, number of realizations
+    # seed: int or np.random.SeedSequence, root seed of the streams. If None, we use scenario['seed']
+    # precision: str, 'double' or 'single' precision of the output (see utils.precision). If None, we use the
+    # precision of the general configuration
+    # Output:
+    # x: np.array, (n_trials,M,N) tensor of output signals
+
+    N = scenario['N']
+    M = len(scenario['positions'])
+    complex_dtype,real_dtype = get_dtypes(precision=precision)
+    # Coherence groups, renumbered 0,...,G-1
+    groups,group_index = np.unique(scenario['group'],return_inverse=True)
+
+    if seed is None:
+        seed = scenario['seed']
+    if not isinstance(seed,np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    streams = [np.random.default_rng(child) for child in seed.spawn(n_trials)]
+
+    # Preallocated buffers: the complex noise buffer is viewed as a real (n_trials,M,2N) array, so the real and imaginary
+    # parts are drawn in place (independent, unit variance, as in generate_data)
+    x = np.empty((n_trials,M,N),dtype=complex_dtype)
+    noise = x.view(real_dtype)
+    # Random phases of the coherence groups (uniform in [0,1), times 2*pi)
+    phases = np.empty((n_trials,len(groups),N),dtype=np.float64)
+    for trial,rng in enumerate(streams):
+        rng.standard_normal(out=noise[trial],dtype=real_dtype)
+        rng.random(out=phases[trial])
+
+    # Steering matrix: (M,K)
+    A = get_array_steering_matrix(positions=scenario['positions'],theta=scenario['theta'],k=scenario['k'],elevation=scenario.get('elevation'))
+
+    # Sources complex amplitudes (K,1) and waveforms for all the trials (n_trials,K,N)
+    amplitudes = np.sqrt(2)*10**(np.asarray(scenario['SNR'])/20)*np.exp(1j*np.asarray(scenario['gamma'])*np.pi/180)
+    n = np.arange(0,N)
+    s = amplitudes[:,np.newaxis]*np.exp(1j*2*np.pi*phases[:,group_index])*np.exp(1j*np.asarray(scenario['omega'])[:,np.newaxis]*scenario['T']*n)
+
+    # x = A@s + noise, added into the noise buffer
+    x += (A@s).astype(complex_dtype,copy=False)
+
+    return x
+
+
+def generate_data_batch(config:dict,n_trials:int,seed=None,precision:str=None) -> np.array :
+
+    # This function generates n_trials independent realizations of the signal model of generate_data in one vectorized
+    # call, without printing anything and without touching the global numpy seed. Each trial gets its own random
+    # stream, spawned from one np.random.SeedSequence: trial i is the same whatever n_trials, and blocks of trials
+    # generated in parallel (with the same seed) are reproducible and independent
+    # Inputs:
+    # config: dict, configuration dictionary (see utils.configuration)
+    # n_trials: int, number of realizations
+    # seed: int or np.random.SeedSequence, root seed of the streams. If None, we use config['seed']
+    # precision: str, 'double' or 'single' precision of the output (see utils.precision). If None, we use the
+    # precision of the general configuration
+    # Output:
+    # x: np.array, (n_trials,M,N) tensor of output signals
 
-    
\ No newline at end of file
+    return simulate_sources(scenario=get_scenario(config),n_trials=n_trials,seed=seed,precision=precision)
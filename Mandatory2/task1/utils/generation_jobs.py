@@ -0,0 +1,93 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the data generation job runner: each dataset (name, configuration, seed) is a job, the jobs are
+# run in a process pool and each job writes its signal matrix atomically. The seed of a job is fixed when the job is
+# created, so the generated data do not depend on the number of workers nor on the order in which the jobs end
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.generate_data import get_data
+from utils.configuration import get_config_1,get_config_2,get_config_SNR_analysis
+
+def get_generation_jobs(snr_values:np.array=None)->list:
+
+    # This function returns the jobs generating all the data for all experiences
+    # Input:
+    # snr_values: np.array, SNR values (in dB) of the SNR analysis. If None, we use -10->10 dB, step 1 dB
+    # Output:
+    # jobs: list, jobs, dicts with keys
+    #   'name': str, name of the .npy file
+    #   'config': dict, configuration (a copy, see utils.configuration)
+    #   'seed': int, seed of the job
+
+    if snr_values is None:
+        snr_values = np.arange(-10,10+1,1)
+
+    # Question 1->7: incoherent sources, question 8: coherent sources
+    jobs = [{'name':'data_incoherent','config':dict(get_config_1())},{'name':'data_coherent','config':dict(get_config_2())}]
+    # SNR analysis
+    for snr in snr_values:
+        jobs.append({'name':'data_coherent_{}'.format(snr),'config':get_config_SNR_analysis(snr)})
+    # Each job keeps the seed of its configuration: all the SNR values are subject to the same noise, as with the
+    # sequential generation
+    for job in jobs:
+        job['seed'] = job['config']['seed']
+
+    return jobs
+
+def run_generation_job(job:dict,directory:str='data/python/',precision:str=None)->dict:
+
+    # This function runs a generation job: the signal matrix is written under a temporary name and then renamed, such
+    # that an interrupted job cannot leave a truncated .npy file
+    # Inputs:
+    # job: dict, job (see get_generation_jobs)
+    # directory: str, folder of the .npy files
+    # precision: str, 'double' or 'single' precision of the signal (see utils.precision). If None, we use the precision
+    # of the general configuration
+    # Output:
+    # report: dict, with keys 'name', 'path', 'pid' (process which ran the job), 'time' (duration, in seconds)
+
+    start = time.perf_counter()
+    x = get_data(config=job['config'],seed=job['seed'],precision=precision,verbose=False)
+
+    path = os.path.join(directory,job['name']+'.npy')
+    # The temporary name must end with .npy, else np.save appends it
+    temporary_path = os.path.join(directory,job['name']+'.tmp.npy')
+    np.save(temporary_path,x)
+    os.replace(temporary_path,path)
+
+    return {'name':job['name'],'path':path,'pid':os.getpid(),'time':time.perf_counter()-start}
+
+def run_generation_jobs(jobs:list,directory:str='data/python/',n_workers:int=None,precision:str=None,verbose:bool=True)->list:
+
+    # This function runs generation jobs in a process pool and reports the duration of each job
+    # Inputs:
+    # jobs: list, jobs (see get_generation_jobs)
+    # directory: str, folder of the .npy files
+    # n_workers: int, number of processes. If None, we use the number of CPUs
+    # precision: str, 'double' or 'single' precision of the signals (see utils.precision). If None, we use the
+    # precision of the general configuration
+    # verbose: bool, if true the timing report is printed
+    # Output:
+    # reports: list, report of each job (see run_generation_job), in the jobs order
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(run_generation_job,job,directory,precision) for job in jobs]
+        reports = [future.result() for future in futures]
+    total_time = time.perf_counter()-start
+
+    if verbose:
+        print('','_'*58,'')
+        print('| {:<30} | {:>8} | {:>12} |'.format('Job','Process','Time (ms)'))
+        print('|','-'*56,'|')
+        for report in reports:
+            print('| {:<30} | {:>8} | {:>12.2f} |'.format(report['name'],report['pid'],1e3*report['time']))
+        print('|','_'*56,'|')
+        print('\n{} jobs in {:.2f} ms (sum of the jobs durations: {:.2f} ms)\n'.format(len(reports),1e3*total_time,1e3*sum(report['time'] for report in reports)))
+
+    return reports
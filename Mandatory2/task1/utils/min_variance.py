@@ -5,8 +5,12 @@
 # This script contains function to estimate the spectrum using the minimum variance MV method
 
 import numpy as np
+import scipy.linalg
 from utils.general_functions import get_steering_vector
 from configuration import get_general_config
+from utils.spectrum_engine import get_DOA_array,get_steering_matrix,get_diagonal_sums,evaluate_diagonal_sums,evaluate_spectrum_fft
+from utils.precision import get_complex_dtype,to_precision
+from utils.structured_correlation_matrix import StructuredCorrelationMatrix
 
 def capon_beamformer(R:np.array,a:np.array)->float:
 
@@ -28,11 +32,249 @@ def capon_beamformer(R:np.array,a:np.array)->float:
     return float(np.real(1/(a.conj().T@np.linalg.inv(R)@a)))
 
 
-def estimate_minimum_variance_spectrum(R:np.array,kd:float,M:int)->np.array:
+class MinimumVarianceEstimator:
+
+    # This class factorizes the spatial correlation matrix R once and evaluates the minimum variance power estimates
+    # 1/(a^H@R^-1@a) for a whole steering matrix, without ever computing R^-1
+    # R can also be a stack of K spatial correlation matrices (K,M,M): the factorizations and solves are then batched
+    # Attributes:
+    # factorization: str, 'cholesky' (R Hermitian positive definite) or 'lu' (fallback for indefinite or non Hermitian R,
+    # e.g. diagonal loading with a large delta or rotary averaging)
+    # factor: the Cholesky lower triangular factor or the scipy LU factorization of R (for a stack, the LU fallback
+    # keeps R itself and lets the batched numpy solver factorize it)
+    # M: int, size of R
+    # dtype: np.dtype, complex dtype of R (precision of the solves)
+    # stacked: bool, True if R is a stack of matrices
+
+    def __init__(self,R:np.array)->None:
+
+        # Inputs:
+        # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+
+        self.M = R.shape[-1]
+        self.dtype = get_complex_dtype(R)
+        self.stacked = R.ndim > 2
+        self.factorization = 'lu'
+        # np.linalg.cholesky only reads the lower triangle, so we only try it on Hermitian matrices
+        if np.allclose(R,np.swapaxes(R,-1,-2).conj()):
+            try:
+                # R = L@L^H
+                self.factor = np.linalg.cholesky(R)
+                self.factorization = 'cholesky'
+            except np.linalg.LinAlgError:
+                # R (or one matrix of the stack) is not positive definite
+                pass
+
+        if self.factorization == 'lu':
+            self.factor = R if self.stacked else scipy.linalg.lu_factor(R)
+
+    @classmethod
+    def from_data(cls,Y:np.array,precision:str=None):
+
+        # This function builds the estimator directly from the signal matrix, without forming R = Y@Y^H/N (square-root
+        # estimator): with the thin QR decomposition Y^H = Q@T, R = T^H@T/N, so L = T^H/sqrt(N) is a Cholesky factor of R.
+        # The QR works on Y, whose condition number is the square root of the one of R, and costs O(N*M^2) without the
+        # O(N*M^2) product plus the O(M^3) Cholesky decomposition
+        # Inputs:
+        # Y: np.array, (M,N) signal matrix, or (K,M,N) stack of signal matrices (N >= M, else R is singular)
+        # precision: str, 'double' or 'single' (see utils.precision). If None, we use the precision of the general configuration
+        # Output:
+        # MinimumVarianceEstimator
+
+        Y = to_precision(Y,precision=precision)
+        M,N = Y.shape[-2:]
+        if N < M:
+            raise ValueError('R is singular with N = {} < M = {} snapshots: use diagonal loading or spatial smoothing'.format(N,M))
+
+        estimator = cls.__new__(cls)
+        estimator.M = M
+        estimator.dtype = get_complex_dtype(Y)
+        estimator.stacked = Y.ndim > 2
+        estimator.factorization = 'cholesky'
+        # Only the triangular factor is needed (mode='r' does not compute Q)
+        T = np.linalg.qr(np.swapaxes(Y,-1,-2).conj(),mode='r')
+        estimator.factor = np.swapaxes(T,-1,-2).conj()/np.sqrt(N)
+
+        return estimator
+
+    def solve(self,B:np.array,cholesky_factor_only:bool=False)->np.array:
+
+        # This function solves R@X = B (or L@X = B if cholesky_factor_only is True) with the factorization
+        # Inputs:
+        # B: np.array, (M,n) right-hand side
+        # cholesky_factor_only: bool, if True, we only solve with the Cholesky factor L
+        # Output:
+        # np.array, (M,n) or (K,M,n) solution
+
+        if self.stacked:
+            # B is shared by all the matrices of the stack (np.linalg.solve would take a 2D B for a stack of vectors)
+            B = np.broadcast_to(B,self.factor.shape[:-2]+B.shape)
+
+        if self.factorization == 'cholesky':
+            if self.stacked:
+                # scipy's triangular solver does not broadcast over stacks: we loop over the matrices of the stack
+                # (np.linalg.solve would do a general O(M^3) LU of each triangular factor)
+                factors = self.factor.reshape((-1,)+self.factor.shape[-2:])
+                X = np.stack([self.solve_cholesky(factor=factor,B=b,cholesky_factor_only=cholesky_factor_only) for factor,b in zip(factors,B.reshape((-1,)+B.shape[-2:]))])
+                return X.reshape(B.shape)
+            return self.solve_cholesky(factor=self.factor,B=B,cholesky_factor_only=cholesky_factor_only)
+
+        if self.stacked:
+            return np.linalg.solve(self.factor,B)
+
+        return scipy.linalg.lu_solve(self.factor,B,check_finite=False)
+
+    @staticmethod
+    def solve_cholesky(factor:np.array,B:np.array,cholesky_factor_only:bool=False)->np.array:
+
+        # This function solves L@L^H@X = B (or L@X = B if cholesky_factor_only is True) with two triangular solves
+        # Inputs:
+        # factor: np.array, (M,M) lower triangular Cholesky factor L
+        # B: np.array, (M,n) right-hand side
+        # cholesky_factor_only: bool, if True, we only solve with L
+        # Output:
+        # np.array, (M,n) solution
+
+        X = scipy.linalg.solve_triangular(factor,B,lower=True,check_finite=False)
+
+        return X if cholesky_factor_only else scipy.linalg.solve_triangular(factor,X,lower=True,trans='C',check_finite=False)
+
+    def get_inverse_quadratic_forms(self,A:np.array)->np.array:
+
+        # This function computes a^H@R^-1@a for all the columns a of the steering matrix A
+        # Inputs:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Output:
+        # np.array, (n_DOA,) array, or (K,n_DOA) for a stack
+
+        # If we do spatial smoothing, we get rid of the last elements of the steering vectors such that shapes fit
+        A = A[:self.M]
+
+        if self.factorization == 'cholesky':
+            # a^H@R^-1@a = ||L^-1@a||^2, and L^-1@A is a single triangular solve
+            X = self.solve(A,cholesky_factor_only=True)
+            return np.sum(np.abs(X)**2,axis=-2)
+
+        X = self.solve(A)
+
+        # For a non Hermitian R, a^H@R^-1@a has an imaginary part: we keep it (as in capon_beamformer)
+        return np.sum(A.conj()*X,axis=-2)
+
+    def get_inverse(self)->np.array:
+
+        # This function computes R^-1 from the factorization (only needed when the whole matrix is used, e.g. root-MV)
+        # Output:
+        # np.array, R^-1
+
+        if self.factorization == 'cholesky':
+            # R^-1 = L^-H@L^-1
+            X = self.solve(np.identity(self.M,dtype=self.dtype),cholesky_factor_only=True)
+            return np.swapaxes(X,-1,-2).conj()@X
+
+        return self.solve(np.identity(self.M,dtype=self.dtype))
+
+    def get_power_estimates(self,A:np.array)->np.array:
+
+        # This function computes the minimum variance power estimates 1/(a^H@R^-1@a) (see capon_beamformer)
+        # Inputs:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Output:
+        # np.array, (n_DOA,) array, or (K,n_DOA) for a stack
+
+        return np.real(1/self.get_inverse_quadratic_forms(A))
+
+
+def estimate_minimum_variance_spectrum(R:np.array,kd:float,M:int,DOA_array:np.array=None,estimator:MinimumVarianceEstimator=None)->np.array:
 
-    
     # This function estimates the spectrum using the Capon's method
     # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # estimator: MinimumVarianceEstimator, factorized R. If None, R is factorized here (once for all the DOA). With
+    # MinimumVarianceEstimator.from_data(Y), R is never formed and R can be None
+    # Output:
+    # np.array, angular spectrum, or (K,n_DOA) array of angular spectra for a stack
+
+    # We factorize R
+    if estimator is None:
+        estimator = MinimumVarianceEstimator(R)
+    # We compute the steering matrix for all the DOA at once
+    A = get_steering_matrix(DOA_array=get_DOA_array(DOA_array),kd=kd,M=M,dtype=estimator.dtype)
+    # We return the power estimates 1/(a^H@R^-1@a)
+
+    return estimator.get_power_estimates(A)
+
+
+def estimate_minimum_variance_spectrum_fft(R:np.array,kd:float,M:int,n_fft:int=2**14,DOA_array:np.array=None,interpolate:bool=True,estimator:MinimumVarianceEstimator=None)->tuple:
+
+    # This function computes the MV spectrum of a ULA with the FFT (see utils.spectrum_engine.evaluate_spectrum_fft)
+    # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # n_fft: int, FFT size
+    # DOA_array: np.array, DOA grid (in degrees) used if interpolate is True. If None, we use the grid of the general configuration
+    # interpolate: bool, if True, the spectrum is interpolated onto the DOA grid. Else, it is given on a uniform sin(DOA) grid
+    # estimator: MinimumVarianceEstimator, factorized R. If None, R is factorized here
+    # Outputs:
+    # DOA_array: np.array, DOA (in degrees)
+    # np.array, angular spectrum, or (K,n_DOA) array of angular spectra for a stack
+
+    if estimator is None:
+        estimator = MinimumVarianceEstimator(R)
+    # The coefficients of a^H@R^-1@a are the diagonal sums of R^-1
+    DOA_array,spectrum = evaluate_spectrum_fft(Q=estimator.get_inverse(),kd=kd,n_fft=n_fft,DOA_array=DOA_array,interpolate=interpolate,transform=lambda values: np.real(1/values))
+
+    return DOA_array,spectrum
+
+
+def estimate_toeplitz_minimum_variance_spectrum(R:np.array,kd:float,M:int,DOA_array:np.array=None)->np.array:
+
+    # This function computes the MV spectrum with the Toeplitz constrained spatial correlation matrix: R is projected
+    # onto the Toeplitz matrices (average of its diagonals, the ideal R of a ULA with uncorrelated sources), inverted
+    # in O(M^2) (Levinson + Trench recursion, see StructuredCorrelationMatrix.get_inverse) and a^H@R^-1@a is evaluated
+    # from the diagonal sums of R^-1 in O(M) per DOA. The whole spectrum costs O(M^2+M*n_DOA) instead of O(M^3+M^2*n_DOA)
+    # Inputs:
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # Output:
+    # np.array, angular spectrum
+
+    inverse = StructuredCorrelationMatrix.from_matrix(R=R,structure='toeplitz').get_inverse()
+    A = get_steering_matrix(DOA_array=get_DOA_array(DOA_array),kd=kd,M=M)
+
+    return np.real(1/evaluate_diagonal_sums(c=get_diagonal_sums(inverse),A=A))
+
+
+def estimate_toeplitz_minimum_variance_spectrum_fft(R:np.array,kd:float,M:int,n_fft:int=2**14,DOA_array:np.array=None,interpolate:bool=True)->tuple:
+
+    # This function computes the Toeplitz constrained MV spectrum (see estimate_toeplitz_minimum_variance_spectrum) with
+    # the FFT (see utils.spectrum_engine.evaluate_spectrum_fft), in O(M^2+n_fft*log(n_fft))
+    # Inputs:
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # n_fft: int, FFT size
+    # DOA_array: np.array, DOA grid (in degrees) used if interpolate is True. If None, we use the grid of the general configuration
+    # interpolate: bool, if True, the spectrum is interpolated onto the DOA grid. Else, it is given on a uniform sin(DOA) grid
+    # Outputs:
+    # DOA_array: np.array, DOA (in degrees)
+    # np.array, angular spectrum
+
+    inverse = StructuredCorrelationMatrix.from_matrix(R=R,structure='toeplitz').get_inverse()
+    DOA_array,spectrum = evaluate_spectrum_fft(Q=inverse,kd=kd,n_fft=n_fft,DOA_array=DOA_array,interpolate=interpolate,transform=lambda values: np.real(1/values))
+
+    return DOA_array,spectrum
+
+
+def estimate_minimum_variance_spectrum_reference(R:np.array,kd:float,M:int)->np.array:
+
+    # This function is the per-DOA reference implementation of estimate_minimum_variance_spectrum
+    # Inputs:
     # R: np.array, spatial correlation matrix
     # kd: float, product of the wavenumber k with the element distance d
     # M: int, number of sensors
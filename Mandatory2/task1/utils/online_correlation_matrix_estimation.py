@@ -0,0 +1,152 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains a streaming estimator of the spatial correlation matrix: the snapshots are given block by block
+# (as they arrive from the array) and R is updated with rank-n updates, without keeping the whole signal matrix Y
+
+import numpy as np
+
+class OnlineCorrelationMatrixEstimator:
+
+    # This class estimates the spatial correlation matrix from a stream of snapshot blocks. Three modes are available:
+    # - growing window (forgetting_factor = 1, window = None): R = sum_n y_n@y_n^H/N, the same as
+    #   get_standard_correlation_matrix_estimation on all the snapshots received so far
+    # - exponential forgetting (forgetting_factor < 1): R = sum_n lambda^(N-1-n)*y_n@y_n^H / sum_n lambda^(N-1-n)
+    # - sliding window (window = N_w): R = sum of the N_w last y_n@y_n^H / N_w (snapshots kept in a ring buffer)
+    # Each update costs O(M^2*block), whatever the number of snapshots received so far
+    # Attributes:
+    # M: int, number of sensors
+    # forgetting_factor: float, exponential forgetting factor lambda in (0,1]
+    # window: int, sliding window length (in snapshots), None if we do not use a sliding window
+    # n_snapshots: int, number of snapshots received so far
+    # weight: float, sum of the weights of the snapshots in the current estimate (effective number of snapshots)
+
+    def __init__(self,M:int,forgetting_factor:float=1.0,window:int=None)->None:
+
+        # Inputs:
+        # M: int, number of sensors
+        # forgetting_factor: float, exponential forgetting factor lambda in (0,1]
+        # window: int, sliding window length (in snapshots). If None, we do not use a sliding window
+
+        if not 0 < forgetting_factor <= 1:
+            raise ValueError('The forgetting factor must be in (0,1]')
+        # An empty window would make the ring buffer empty and the modulo of the update divide by zero
+        if window is not None and window < 1:
+            raise ValueError('The sliding window length must be at least 1 snapshot, got {}'.format(window))
+        if window is not None and forgetting_factor != 1:
+            raise ValueError('The sliding window and the exponential forgetting cannot be used together')
+
+        self.M = M
+        self.forgetting_factor = forgetting_factor
+        self.window = window
+        self.n_snapshots = 0
+        self.weight = 0.
+        # Weighted sum of the outer products y_n@y_n^H
+        self.outer_products_sum = np.zeros((M,M),dtype=complex)
+
+        if window is not None:
+            # Ring buffer of the last window snapshots, position is the column where the next snapshot is written
+            self.buffer = np.zeros((M,window),dtype=complex)
+            self.position = 0
+            # Number of snapshots written since the last exact recomputation of the sum
+            self.n_since_refresh = 0
+
+    def update(self,Y:np.array)->None:
+
+        # This function updates the estimate with a new block of snapshots
+        # Input:
+        # Y: np.array, (M,n) signal matrix of the new block (a (M,) snapshot is also accepted)
+
+        Y = np.asarray(Y)
+        if Y.ndim == 1:
+            Y = Y[:,np.newaxis]
+        n = Y.shape[1]
+        if n == 0:
+            return None
+
+        if self.window is None:
+            self.update_exponential(Y=Y)
+        else:
+            self.update_sliding_window(Y=Y)
+        self.n_snapshots += n
+
+        return None
+
+    def update_exponential(self,Y:np.array)->None:
+
+        # This function does the rank-n update of the exponentially weighted (or growing window) estimate
+        # Input:
+        # Y: np.array, (M,n) signal matrix of the new block
+
+        n = Y.shape[1]
+        lam = self.forgetting_factor
+
+        if lam == 1:
+            self.outer_products_sum += Y@Y.conj().T
+            self.weight += n
+        else:
+            # Snapshot j of the block gets the weight lambda^(n-1-j), the older ones are multiplied by lambda^n
+            weights = lam**np.arange(n-1,-1,-1)
+            self.outer_products_sum = lam**n*self.outer_products_sum+(Y*weights)@Y.conj().T
+            self.weight = lam**n*self.weight+np.sum(weights)
+
+        return None
+
+    def update_sliding_window(self,Y:np.array)->None:
+
+        # This function does the rank-n update of the sliding window estimate: the new snapshots are added and the
+        # snapshots leaving the window are removed
+        # Input:
+        # Y: np.array, (M,n) signal matrix of the new block
+
+        # If the block is longer than the window, only its last window snapshots matter
+        Y = Y[:,-self.window:]
+        n = Y.shape[1]
+        # Columns of the ring buffer where the new snapshots are written
+        columns = (self.position+np.arange(n))%self.window
+        # The snapshots we overwrite leave the window (the buffer is filled with zeros at the beginning)
+        old = self.buffer[:,columns]
+
+        self.outer_products_sum += Y@Y.conj().T-old@old.conj().T
+        self.buffer[:,columns] = Y
+        self.position = (self.position+n)%self.window
+        self.weight = min(self.weight+n,self.window)
+
+        # The additions and subtractions accumulate rounding errors: once per window, we recompute the sum exactly
+        # from the buffer (O(M^2*window) every window snapshots, i.e. still O(M^2) per snapshot)
+        self.n_since_refresh += n
+        if self.n_since_refresh >= self.window:
+            self.outer_products_sum = self.buffer@self.buffer.conj().T
+            self.n_since_refresh = 0
+
+        return None
+
+    def get_correlation_matrix(self,forward_backward:bool=False)->np.array:
+
+        # This function returns the current estimate of the spatial correlation matrix
+        # Input:
+        # forward_backward: bool, if True, we return the forward-backward averaged estimate 1/2*(R+J@R^*@J)
+        # Output:
+        # R: np.array, (M,M) spatial correlation matrix
+
+        if self.weight == 0:
+            return np.zeros((self.M,self.M),dtype=complex)
+
+        R = self.outer_products_sum/self.weight
+        # The updates are Hermitian up to rounding errors, we make the estimate exactly Hermitian
+        R = 1/2*(R+R.conj().T)
+
+        if forward_backward:
+            # J@R^*@J is R^* with the rows and the columns in reverse order: no need for the products with J
+            R = 1/2*(R+R[::-1,::-1].conj())
+
+        return R
+
+    def reset(self)->None:
+
+        # This function forgets all the snapshots received so far
+
+        self.__init__(M=self.M,forgetting_factor=self.forgetting_factor,window=self.window)
+
+        return None
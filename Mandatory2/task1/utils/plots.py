@@ -11,10 +11,7 @@ mpl.rcParams['mathtext.fontset'] = 'stix'
 mpl.rcParams['font.family'] = 'STIXGeneral'
 from cmcrameri import cm
 import numpy as np
-from utils.standard_DAS import  estimate_classical_spectrum
-from utils.eigenvector import estimate_eigenvector_spectrum
-from utils.music import estimate_music_spectrum
-from utils.min_variance import estimate_minimum_variance_spectrum
+from utils.all_spectra import estimate_all_spectra
 from utils.configuration import get_general_config,get_config_2
 
 
@@ -93,22 +90,13 @@ def plot_power_estimates(spatial_correlation_matrix,path,title)->None:
 
     # We construct the DOA vector: from -50° to +50°, step 0.25°
     DOA = get_general_config()['DOA_array']
-    # We get the power spectrum estimate
-    minimum_variance_spectrum_estimate = estimate_minimum_variance_spectrum(R=spatial_correlation_matrix,kd=kd,M=M)
-    # We normalized it and convert it into dB 
-    minimum_variance_spectrum_estimate = 10*np.log10(minimum_variance_spectrum_estimate/np.max(minimum_variance_spectrum_estimate))
-    # We get the power spectrum estimate
-    classical_spectrum_estimate = estimate_classical_spectrum(R=spatial_correlation_matrix,kd=kd,M=M)
-    # We normalized it and convert it into dB 
-    classical_spectrum_estimate = 10*np.log10(classical_spectrum_estimate/np.max(classical_spectrum_estimate))
-    # We get the power spectrum estimate
-    music_spectrum_estimate = estimate_music_spectrum(R=spatial_correlation_matrix,kd=kd,M=M,Ns=2)
-    # We normalized it and convert it into dB 
-    music_spectrum_estimate = 10*np.log10(music_spectrum_estimate/np.max(music_spectrum_estimate))
-    # We get the power spectrum estimate
-    eigenvector_spectrum_estimate = estimate_eigenvector_spectrum(R=spatial_correlation_matrix,kd=kd,M=M,Ns=2)
-    # We normalized it and convert it into dB 
-    eigenvector_spectrum_estimate = 10*np.log10(eigenvector_spectrum_estimate/np.max(eigenvector_spectrum_estimate))
+    # We get the four power spectrum estimates in a single pass (one eigendecomposition, one steering matrix)
+    spectra = estimate_all_spectra(R=spatial_correlation_matrix,kd=kd,M=M,Ns=2)
+    # We normalized them and convert them into dB 
+    minimum_variance_spectrum_estimate = 10*np.log10(spectra['MV']/np.max(spectra['MV']))
+    classical_spectrum_estimate = 10*np.log10(spectra['DAS']/np.max(spectra['DAS']))
+    music_spectrum_estimate = 10*np.log10(spectra['MUSIC']/np.max(spectra['MUSIC']))
+    eigenvector_spectrum_estimate = 10*np.log10(spectra['EV']/np.max(spectra['EV']))
 
     
     fig,ax = plt.subplots(1)
@@ -0,0 +1,53 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the precision policy of the DOA pipeline: 'double' (complex128/float64, default) or 'single'
+# (complex64/float32, half the memory bandwidth and cache footprint). The policy is applied where the data enters the
+# pipeline (data generation, spatial correlation matrix estimation) and the following stages (steering matrices,
+# factorizations, spectra) follow the precision of the spatial correlation matrix
+
+import numpy as np
+from utils.configuration import get_general_config
+
+precisions = {'double':(np.complex128,np.float64),'single':(np.complex64,np.float32)}
+
+def get_dtypes(precision:str=None)->tuple:
+
+    # This function returns the complex and real dtypes of a precision
+    # Input:
+    # precision: str, 'double' or 'single'. If None, we use the precision of the general configuration
+    # Outputs:
+    # complex_dtype: np.dtype, complex dtype
+    # real_dtype: np.dtype, real dtype
+
+    if precision is None:
+        precision = get_general_config()['precision']
+    if precision not in precisions:
+        raise ValueError('Unknown precision {}, the available precisions are {}'.format(precision,tuple(precisions)))
+
+    return precisions[precision]
+
+def to_precision(x:np.array,precision:str=None)->np.array:
+
+    # This function casts a (complex) array to a precision (without copy if it already has the right dtype)
+    # Inputs:
+    # x: np.array, array to cast (signal matrix, spatial correlation matrix...)
+    # precision: str, 'double' or 'single'. If None, we use the precision of the general configuration
+    # Output:
+    # np.array, array with the complex dtype of the precision
+
+    complex_dtype,_ = get_dtypes(precision=precision)
+
+    return np.asarray(x).astype(complex_dtype,copy=False)
+
+def get_complex_dtype(x:np.array)->np.dtype:
+
+    # This function returns the complex dtype matching the precision of an array: complex64 for single precision arrays
+    # (complex64, float32), complex128 otherwise
+    # Input:
+    # x: np.array, array (spatial correlation matrix, eigenvectors...)
+    # Output:
+    # np.dtype, complex dtype
+
+    return np.result_type(x.dtype,np.complex64)
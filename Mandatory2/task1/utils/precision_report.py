@@ -0,0 +1,65 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains a function to assess the accuracy of the single precision pipeline (see utils.precision):
+# the DAS, MV, MUSIC and EV spectra are computed in double and in single precision and we compare their properties
+# (estimated DOA, ML 3dB widths, see utils.properties.estimate_DOA)
+
+import numpy as np
+from utils.correlation_matrix_estimation import get_standard_correlation_matrix_estimation
+from utils.all_spectra import estimate_all_spectra
+from utils.properties import estimate_DOA
+from utils.spectrum_engine import get_DOA_array
+
+def get_precision_report(Y:np.array,kd:float,M:int,Ns:int,DOA_array:np.array=None)->dict:
+
+    # This function compares the single and double precision pipelines on a signal matrix
+    # Inputs:
+    # Y: np.array, signal matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # Ns: int, number of sources
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # Output:
+    # report: dict, report[estimator] (estimator in 'DAS', 'MV', 'MUSIC', 'EV') is a dict with keys
+    #   'estimated_DOA_double', 'estimated_DOA_single': np.array, estimated DOA (in degrees)
+    #   'ML_3dB_width_double', 'ML_3dB_width_single': np.array, ML 3dB widths (in degrees)
+    #   'DOA_error': float, max absolute difference between the estimated DOA (in degrees)
+    #   'ML_3dB_width_error': float, max absolute difference between the ML 3dB widths (in degrees)
+    #   'spectrum_error_dB': float, max absolute difference between the normalized spectra (in dB)
+
+    DOA_array = get_DOA_array(DOA_array)
+
+    spectra = dict()
+    for precision in ('double','single'):
+        R = get_standard_correlation_matrix_estimation(Y=Y,precision=precision)
+        spectra[precision] = estimate_all_spectra(R=R,kd=kd,M=M,Ns=Ns,DOA_array=DOA_array)
+
+    report = dict()
+    for estimator in ('DAS','MV','MUSIC','EV'):
+        props = dict()
+        spectrum_dB = dict()
+        for precision in ('double','single'):
+            # Normalized spectrum in dB (computed in double precision from the spectrum values, as in the plots)
+            spectrum = spectra[precision][estimator].astype(np.float64)
+            spectrum_dB[precision] = 10*np.log10(spectrum/np.max(spectrum))
+            props[precision] = estimate_DOA(DOA_array=DOA_array,power_estimate=spectrum_dB[precision],Ns=Ns)
+
+        report[estimator] = dict()
+        for precision in ('double','single'):
+            estimated_DOA = np.array(props[precision]['estimated_DOA'])
+            # estimate_DOA sorts the DOA in ascending order but gives the widths in the peaks order (descending power):
+            # we sort the widths like the DOA such that the two precisions can be compared peak by peak
+            peaks_order = np.flip(np.argsort(spectrum_dB[precision][np.searchsorted(DOA_array,estimated_DOA)]))
+            widths = np.zeros(len(estimated_DOA))
+            widths[peaks_order] = props[precision]['ML_3dB_width']
+            report[estimator]['estimated_DOA_'+precision] = estimated_DOA
+            report[estimator]['ML_3dB_width_'+precision] = widths
+        # The two precisions can detect a different number of peaks (e.g. a peak just below a side lobe)
+        n = min(len(report[estimator]['estimated_DOA_double']),len(report[estimator]['estimated_DOA_single']))
+        report[estimator]['DOA_error'] = np.max(np.abs(report[estimator]['estimated_DOA_double'][:n]-report[estimator]['estimated_DOA_single'][:n]),initial=0)
+        report[estimator]['ML_3dB_width_error'] = np.max(np.abs(report[estimator]['ML_3dB_width_double'][:n]-report[estimator]['ML_3dB_width_single'][:n]),initial=0)
+        report[estimator]['spectrum_error_dB'] = np.max(np.abs(spectrum_dB['double']-spectrum_dB['single']))
+
+    return report
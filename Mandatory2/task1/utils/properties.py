@@ -40,14 +40,15 @@ def estimate_DOA(DOA_array:np.array,power_estimate:np.array,Ns:int)->np.array:
         ML_3dB_width_left = None
 
         index = peak_index
-        # We compute the left -3dB width
-        while power_estimate[index] > peak_value - 3:
+        # We compute the left -3dB width (if the spectrum does not go below -3dB before the end of the grid, we stop at
+        # the last DOA of the grid)
+        while power_estimate[index] > peak_value - 3 and index < len(DOA_array)-1:
             index += 1
             ML_3dB_width_right = DOA_array[index]
 
         index = peak_index
-        # We compute the right -3dB width
-        while power_estimate[index] > peak_value - 3:
+        # We compute the right -3dB width (same, we stop at the first DOA of the grid)
+        while power_estimate[index] > peak_value - 3 and index > 0:
             index -= 1
             ML_3dB_width_left = DOA_array[index]
         # We add the mean of these two values to the dict
@@ -0,0 +1,76 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains gridless DOA estimators for the ULA: root-MUSIC and root-MV.
+# For a ULA, a^H@Q@a is a polynomial in z = exp(1j*kd*sin(DOA)) (see utils.spectrum_engine.get_diagonal_sums).
+# Instead of scanning the spectrum on a DOA grid, we compute the roots of this polynomial: the roots closest to the
+# unit circle give the DOA directly.
+
+import numpy as np
+from utils.spectrum_engine import get_diagonal_sums
+from utils.subspace import Subspace
+from utils.min_variance import MinimumVarianceEstimator
+
+def estimate_DOA_from_polynomial(Q:np.array,kd:float,Ns:int)->np.array:
+
+    # This function estimates the DOA from the roots of the polynomial z^(M-1)*a^H@Q@a
+    # Inputs:
+    # Q: np.array, (M,M) matrix (noise subspace projector, inverse spatial correlation matrix...)
+    # kd: float, product of the wavenumber k with the element distance d
+    # Ns: int, number of sources
+    # Output:
+    # np.array, the Ns estimated DOA (in degrees), sorted in ascending order
+
+    # Coefficients c_k, k = -(M-1),...,M-1. Multiplying by z^(M-1), c_k becomes the coefficient of z^(k+M-1)
+    # np.roots takes the coefficients from the highest degree to the lowest one
+    roots = np.roots(np.flip(get_diagonal_sums(Q)))
+
+    # Q is Hermitian, so the roots come in pairs (z,1/conj(z)): we only keep the roots inside the unit circle
+    roots = roots[np.abs(roots) < 1]
+    # The Ns roots closest to the unit circle correspond to the sources
+    roots = roots[np.argsort(1-np.abs(roots))][:Ns]
+
+    # z = exp(1j*kd*sin(DOA))
+    sin_DOA = np.clip(np.angle(roots)/kd,-1,1)
+
+    return np.sort(np.arcsin(sin_DOA)*180/np.pi)
+
+def estimate_root_music_DOA(R:np.array,kd:float,Ns:int,subspace:Subspace=None)->np.array:
+
+    # This function estimates the DOA with the root-MUSIC method
+    # Inputs:
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # Ns: int, number of sources
+    # subspace: Subspace, eigendecomposition of R. If None, it is computed here
+    # Output:
+    # np.array, the Ns estimated DOA (in degrees), sorted in ascending order
+
+    # We get the noise subspace
+    if subspace is None:
+        subspace = Subspace(R)
+    _,eigenvectors = subspace.get_noise_subspace(Ns=Ns)
+
+    # The MUSIC polynomial is a^H@En@En^H@a
+
+    return estimate_DOA_from_polynomial(Q=eigenvectors@eigenvectors.conj().T,kd=kd,Ns=Ns)
+
+def estimate_root_minimum_variance_DOA(R:np.array,kd:float,Ns:int,estimator:MinimumVarianceEstimator=None)->np.array:
+
+    # This function estimates the DOA with the root-MV (root-Capon) method
+    # Inputs:
+    # R: np.array, spatial correlation matrix
+    # kd: float, product of the wavenumber k with the element distance d
+    # Ns: int, number of sources
+    # estimator: MinimumVarianceEstimator, factorized R. If None, R is factorized here
+    # Output:
+    # np.array, the Ns estimated DOA (in degrees), sorted in ascending order
+
+    # We factorize R
+    if estimator is None:
+        estimator = MinimumVarianceEstimator(R)
+
+    # The MV polynomial is a^H@R^-1@a
+
+    return estimate_DOA_from_polynomial(Q=estimator.get_inverse(),kd=kd,Ns=Ns)
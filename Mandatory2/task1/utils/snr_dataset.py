@@ -0,0 +1,223 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the SNR dataset container: all the realizations of an SNR sweep are stored in a single
+# uncompressed .npz file as one stacked (n_SNR,n_trials,M,N) array, next to the SNR values and the generation metadata
+# (the configuration used for each SNR). As the archive is not compressed, the stacked array is memory mapped directly
+# inside the .npz file: the dataset is opened once and only the sliced realizations are read from the disk
+# When the dataset is built from .npy files, the size and the modification time of each of them are stored in the
+# metadata: the dataset is rebuilt as soon as one of these files changes (see open_snr_dataset)
+
+import os
+import json
+import struct
+import zipfile
+import numpy as np
+from utils.configuration import get_config_SNR_analysis
+
+def write_snr_dataset(path:str,Y:np.array,snr_values:np.array,configs:list,source:str,source_files:list=None)->None:
+
+    # This function writes an SNR dataset. The file is written under a temporary name and then renamed, such that an
+    # interrupted write cannot leave a corrupted dataset
+    # Inputs:
+    # path: str, path of the .npz file
+    # Y: np.array, (n_SNR,n_trials,M,N) stacked signal matrices
+    # snr_values: np.array, (n_SNR,) SNR values (in dB)
+    # configs: list, configuration dict used for each SNR value
+    # source: str, origin of the realizations (e.g. 'matlab' or 'python')
+    # source_files: list, files the realizations were read from (see get_file_status), None if they were generated
+    # Output: None
+
+    if Y.ndim != 4 or Y.shape[0] != len(snr_values) or len(configs) != len(snr_values):
+        raise ValueError('Y must have the shape (n_SNR,n_trials,M,N) with one SNR value and one configuration per SNR, got Y.shape = {}, {} SNR values and {} configurations'.format(Y.shape,len(snr_values),len(configs)))
+
+    # The metadata are stored as a JSON string (and not as a pickled object) such that the archive can be read without
+    # allow_pickle. The numpy scalars of the configurations are converted into python floats
+    metadata = json.dumps({'source':source,'configs':configs,'source_files':source_files},default=float)
+
+    temporary_path = path+'.tmp'
+    # We give a file object to np.savez: with a file name, numpy would append '.npz' to the temporary name
+    with open(temporary_path,'wb') as file:
+        np.savez(file,Y=np.ascontiguousarray(Y),snr_values=np.asarray(snr_values),metadata=np.array(metadata))
+    os.replace(temporary_path,path)
+
+    return None
+
+def build_snr_dataset(data:str,snr_values:np.array,path:str=None)->str:
+
+    # This function gathers the data_coherent_{snr}.npy files of an SNR sweep into a single SNR dataset (one trial
+    # per SNR value)
+    # Inputs:
+    # data: str, 'matlab' or 'python', folder of the .npy files in data/
+    # snr_values: np.array, SNR values (in dB)
+    # path: str, path of the .npz file. If None, we use data/{data}/data_coherent_snr.npz
+    # Output:
+    # path: str, path of the .npz file
+
+    if path is None:
+        path = 'data/'+data+'/data_coherent_snr.npz'
+
+    file_paths = ['data/'+data+'/data_coherent_{}.npy'.format(snr) for snr in snr_values]
+    # The files status is read before the files: a file modified during the build is seen as changed at the next opening
+    source_files = [get_file_status(path=file_path) for file_path in file_paths]
+    Y = np.stack([np.load(file_path)[np.newaxis] for file_path in file_paths])
+    configs = [get_config_SNR_analysis(snr) for snr in snr_values]
+    write_snr_dataset(path=path,Y=Y,snr_values=snr_values,configs=configs,source=data,source_files=source_files)
+
+    return path
+
+def get_file_status(path:str)->dict:
+
+    # This function returns what identifies a version of a file: its path, its size and its modification time
+    # Input:
+    # path: str, file path
+    # Output:
+    # dict, with keys 'path', 'size' and 'mtime_ns'
+
+    status = os.stat(path)
+
+    return {'path':path,'size':status.st_size,'mtime_ns':status.st_mtime_ns}
+
+def open_snr_dataset(data:str,snr_values:np.array,path:str=None):
+
+    # This function opens the SNR dataset of data/{data}/, and (re)builds it first if it does not exist, if it does
+    # not contain the requested SNR values, or if one of its source .npy files changed since it was built (e.g. after a
+    # new MATLAB conversion or a new data generation)
+    # Inputs:
+    # data: str, 'matlab' or 'python', folder of the .npy files in data/
+    # snr_values: np.array, SNR values (in dB)
+    # path: str, path of the .npz file. If None, we use data/{data}/data_coherent_snr.npz
+    # Output:
+    # SNRDataset
+
+    if path is None:
+        path = 'data/'+data+'/data_coherent_snr.npz'
+
+    if os.path.exists(path):
+        dataset = SNRDataset(path=path)
+        if dataset.is_up_to_date() and np.isin(snr_values,dataset.snr_values).all():
+            return dataset
+        # The memory map must be released before the file is replaced
+        del dataset
+
+    build_snr_dataset(data=data,snr_values=snr_values,path=path)
+
+    return SNRDataset(path=path)
+
+class SNRDataset:
+
+    # This class gives a memory mapped access to an SNR dataset (see write_snr_dataset)
+    # Attributes:
+    # path: str, path of the .npz file
+    # Y: np.memmap, read-only (n_SNR,n_trials,M,N) stacked signal matrices
+    # snr_values: np.array, (n_SNR,) SNR values (in dB)
+    # configs: list, configuration dict used for each SNR value
+    # source: str, origin of the realizations
+    # source_files: list, status of the files the realizations were read from (see get_file_status), None if unknown
+
+    def __init__(self,path:str)->None:
+
+        # Input:
+        # path: str, path of the .npz file
+
+        self.path = path
+        with zipfile.ZipFile(path) as archive:
+            info = archive.getinfo('Y.npy')
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError('The stacked array of {} is compressed and cannot be memory mapped, the dataset must be written with write_snr_dataset'.format(path))
+            self.snr_values = np.load(archive.open('snr_values.npy'))
+            metadata = json.loads(np.load(archive.open('metadata.npy'))[()])
+
+        self.configs = metadata['configs']
+        self.source = metadata['source']
+        self.source_files = metadata.get('source_files')
+        self.Y = self.open_member(info=info)
+
+    def open_member(self,info:zipfile.ZipInfo)->np.memmap:
+
+        # This function memory maps a stored (uncompressed) .npy member of the archive. The member data start after
+        # the zip local header (30 bytes + file name + extra field, the extra field can differ from the one of the
+        # central directory) and the .npy header
+        # Input:
+        # info: zipfile.ZipInfo, archive member
+        # Output:
+        # np.memmap, read-only array
+
+        with open(self.path,'rb') as file:
+            file.seek(info.header_offset)
+            local_header = file.read(30)
+            name_length,extra_length = struct.unpack('<HH',local_header[26:30])
+            file.seek(info.header_offset+30+name_length+extra_length)
+            version = np.lib.format.read_magic(file)
+            if version == (1,0):
+                shape,fortran_order,dtype = np.lib.format.read_array_header_1_0(file)
+            else:
+                shape,fortran_order,dtype = np.lib.format.read_array_header_2_0(file)
+            offset = file.tell()
+
+        return np.memmap(self.path,dtype=dtype,mode='r',shape=shape,order='F' if fortran_order else 'C',offset=offset)
+
+    def is_up_to_date(self)->bool:
+
+        # This function checks that the source files of the dataset did not change since it was built
+        # Output:
+        # bool, false if a source file was modified or removed. Always true for a dataset without source files
+
+        if self.source_files is None:
+            return True
+        for source_file in self.source_files:
+            if not os.path.exists(source_file['path']) or get_file_status(path=source_file['path']) != source_file:
+                return False
+
+        return True
+
+    def get_index(self,snr:float)->int:
+
+        # This function returns the index of an SNR value along the first axis of Y
+        # Input:
+        # snr: float, SNR value (in dB)
+        # Output:
+        # int, index
+
+        index = np.flatnonzero(self.snr_values == snr)
+        if len(index) == 0:
+            raise ValueError('SNR {} dB is not in the dataset, the available SNR values are {}'.format(snr,self.snr_values))
+
+        return int(index[0])
+
+    def get(self,snr:float=None,trial:int=None)->np.array:
+
+        # This function slices the dataset by SNR and/or by trial (only the sliced realizations are read)
+        # Inputs:
+        # snr: float or array-like, SNR value(s) (in dB). If None, all the SNR values are returned
+        # trial: int, trial index. If None, all the trials are returned
+        # Output:
+        # np.array, signal matrices, e.g. (M,N) for one SNR and one trial, (n_SNR,M,N) for one trial of several SNR values
+
+        if snr is None:
+            snr_index = slice(None)
+        elif np.ndim(snr) == 0:
+            snr_index = self.get_index(snr=snr)
+        else:
+            snr_index = [self.get_index(snr=value) for value in snr]
+            # Contiguous SNR values are sliced (a view of the memory map) instead of being gathered
+            if snr_index == list(range(snr_index[0],snr_index[0]+len(snr_index))):
+                snr_index = slice(snr_index[0],snr_index[0]+len(snr_index))
+        trial_index = slice(None) if trial is None else trial
+
+        return self.Y[snr_index,trial_index]
+
+    def get_config(self,snr:float)->dict:
+
+        # This function returns the configuration used to generate the realizations of an SNR value
+        # Input:
+        # snr: float, SNR value (in dB)
+        # Output:
+        # dict, configuration
+
+        return self.configs[self.get_index(snr=snr)]
+
+    def __len__(self)->int:
+
+        return len(self.snr_values)
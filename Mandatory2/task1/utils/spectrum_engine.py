@@ -0,0 +1,265 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the batched spectrum engine shared by all the estimators (DAS, MV, MUSIC, EV):
+# the steering matrix of the whole DOA grid is built once and the quadratic forms a^H@Q@a are evaluated
+# for all the DOA at once (instead of looping over the DOA in python). The steering matrices are cached process-wide.
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from utils.configuration import get_general_config
+from utils.precision import get_complex_dtype
+
+class SteeringMatrixCache:
+
+    # This class is a process-wide LRU cache of read-only steering matrices, keyed by the array geometry (M),
+    # the wavenumber (kd), the DOA grid and the dtype (precision). When the memory cap is reached, the least recently used matrices are evicted
+    # Attributes:
+    # max_bytes: int, memory cap (in bytes)
+    # nbytes: int, memory currently used by the cached matrices (in bytes)
+    # hits: int, number of cache hits
+    # misses: int, number of cache misses
+
+    def __init__(self,max_bytes:int)->None:
+
+        # Inputs:
+        # max_bytes: int, memory cap (in bytes)
+
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.matrices = OrderedDict()
+
+    def get_key(self,DOA_array:np.array,kd:float,M:int,dtype:np.dtype=np.complex128)->tuple:
+
+        # This function computes the cache key
+        # Inputs:
+        # DOA_array: np.array, directions of arrival in degrees
+        # kd: float, product of the wavenumber k with the element distance d
+        # M: int, number of sensors
+        # dtype: np.dtype, complex dtype of the steering matrix
+        # Output:
+        # tuple, cache key
+
+        DOA_array = np.ascontiguousarray(DOA_array,dtype=float)
+        # Hashing the grid is O(n_DOA) but way cheaper than the complex exponentials
+        grid_hash = hashlib.blake2b(DOA_array.tobytes(),digest_size=16).hexdigest()
+
+        return (float(kd),int(M),DOA_array.shape,grid_hash,np.dtype(dtype).str)
+
+    def get(self,DOA_array:np.array,kd:float,M:int,dtype:np.dtype=np.complex128)->np.array:
+
+        # This function returns the (read-only) steering matrix, computed only if it is not in the cache
+        # Inputs:
+        # DOA_array: np.array, directions of arrival in degrees
+        # kd: float, product of the wavenumber k with the element distance d
+        # M: int, number of sensors
+        # dtype: np.dtype, complex dtype of the steering matrix
+        # Output:
+        # np.array, read-only steering matrix with shape (M,n_DOA)
+
+        key = self.get_key(DOA_array=DOA_array,kd=kd,M=M,dtype=dtype)
+
+        if key in self.matrices:
+            self.hits += 1
+            # Most recently used matrix
+            self.matrices.move_to_end(key)
+            return self.matrices[key]
+
+        self.misses += 1
+        A = compute_steering_matrix(DOA_array=DOA_array,kd=kd,M=M,dtype=dtype)
+        A.flags.writeable = False
+
+        # Matrices bigger than the memory cap are not cached
+        if A.nbytes <= self.max_bytes:
+            self.matrices[key] = A
+            self.nbytes += A.nbytes
+            # We evict the least recently used matrices until we are under the memory cap
+            while self.nbytes > self.max_bytes:
+                _,evicted = self.matrices.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+        return A
+
+    def clear(self)->None:
+
+        # This function empties the cache
+
+        self.matrices.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        return None
+
+# Process-wide steering matrices cache
+steering_matrix_cache = SteeringMatrixCache(max_bytes=get_general_config()['steering_cache_max_bytes'])
+
+def get_DOA_array(DOA_array:np.array=None)->np.array:
+
+    # This function returns the DOA grid on which the spectrum is estimated
+    # Inputs:
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # Output:
+    # np.array, DOA grid (in degrees)
+
+    if DOA_array is None:
+        return get_general_config()['DOA_array']
+
+    return np.asarray(DOA_array)
+
+def compute_steering_matrix(DOA_array:np.array,kd:float,M:int,dtype:np.dtype=np.complex128)->np.array:
+
+    # This function computes the steering matrix of a ULA for a whole DOA grid
+    # Inputs:
+    # DOA_array: np.array, directions of arrival in degrees
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # dtype: np.dtype, complex dtype of the steering matrix
+    # Output:
+    # np.array, steering matrix with shape (M,n_DOA). Column i is get_steering_vector(DOA=DOA_array[i],kd=kd,M=M)
+
+    # Phi = phase shift between two consecutive sensors (for each DOA)
+    phi = -kd*np.sin(np.asarray(DOA_array)*np.pi/180)
+
+    # Element m of the steering vector is exp(-1j*phi)^m: we compute all of them with one outer product. The phases
+    # are always computed in double precision (m*phi grows with M), only the result is cast to the requested dtype
+
+    return np.exp(-1j*np.arange(0,M)[:,np.newaxis]*phi[np.newaxis,:]).astype(dtype,copy=False)
+
+def get_steering_matrix(DOA_array:np.array,kd:float,M:int,use_cache:bool=True,dtype:np.dtype=np.complex128)->np.array:
+
+    # This function returns the steering matrix of a ULA for a whole DOA grid, from the process-wide cache
+    # Inputs:
+    # DOA_array: np.array, directions of arrival in degrees
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # use_cache: bool, if False, the steering matrix is always recomputed (and not cached)
+    # dtype: np.dtype, complex dtype of the steering matrix (np.complex64 for the single precision pipeline, see
+    # utils.precision.get_complex_dtype)
+    # Output:
+    # np.array, read-only steering matrix with shape (M,n_DOA)
+
+    if not use_cache:
+        return compute_steering_matrix(DOA_array=DOA_array,kd=kd,M=M,dtype=dtype)
+
+    return steering_matrix_cache.get(DOA_array=DOA_array,kd=kd,M=M,dtype=dtype)
+
+def get_quadratic_forms(Q:np.array,A:np.array)->np.array:
+
+    # This function computes the quadratic forms a^H@Q@a for all the columns a of the steering matrix A
+    # Inputs:
+    # Q: np.array, (M',M') matrix (spatial correlation matrix, its inverse, a projector...)
+    # A: np.array, (M,n_DOA) steering matrix
+    # Output:
+    # np.array, complex array with shape (n_DOA,) containing a^H@Q@a for each DOA
+
+    # If we do spatial smoothing, the smoothed spatial correlation matrix will be (M-L+1)x(M-L+1) where L is the
+    # subarrays size and M the full array size. As in the per-DOA functions, we get rid of the last elements
+    # of the steering vectors such that shapes fit
+    A = A[:Q.shape[-1]]
+
+    # sum over the sensors of conj(A)*(Q@A) = diagonal of A^H@Q@A, without computing the off-diagonal terms
+
+    return np.sum(A.conj()*(Q@A),axis=-2)
+
+def get_diagonal_sums(Q:np.array)->np.array:
+
+    # For a ULA, a^H@Q@a = sum_k c_k*z^k with z = exp(1j*kd*sin(DOA)): it is a trigonometric polynomial whose
+    # coefficients c_k are the sums of the diagonals of Q. This function computes these coefficients
+    # Inputs:
+    # Q: np.array, (M',M') matrix (spatial correlation matrix, its inverse, a projector...)
+    # Output:
+    # np.array, (2M'-1,) array of coefficients c_k for k = -(M'-1),...,M'-1
+
+    M = Q.shape[-1]
+
+    return np.array([np.trace(Q,offset=k,axis1=-2,axis2=-1) for k in range(-(M-1),M)]).T
+
+def evaluate_diagonal_sums(c:np.array,A:np.array)->np.array:
+
+    # This function evaluates a^H@Q@a = sum_k c_k*z^k (see get_diagonal_sums) for all the columns a of the steering
+    # matrix A, from the coefficients c_k only: the powers z^k and z^-k are the rows of A and of conj(A), so it costs
+    # O(M*n_DOA) instead of O(M^2*n_DOA) for get_quadratic_forms
+    # Inputs:
+    # c: np.array, (2M'-1,) array of coefficients c_k for k = -(M'-1),...,M'-1
+    # A: np.array, (M,n_DOA) steering matrix
+    # Output:
+    # np.array, complex array with shape (n_DOA,) containing a^H@Q@a for each DOA
+
+    M = (c.shape[-1]+1)//2
+    A = A[:M]
+
+    # k >= 0: c_k*z^k, k < 0: c_k*conj(z)^|k| with c_-1,...,c_-(M'-1) in reverse order
+
+    return c[...,M-1:]@A+c[...,M-2::-1]@A[1:].conj()
+
+def evaluate_spectrum_fft(Q:np.array,kd:float,n_fft:int=2**14,DOA_array:np.array=None,interpolate:bool=True,transform=None,rtol:float=1e-4)->tuple:
+
+    # This function evaluates a^H@Q@a for a ULA with a single zero-padded FFT of the coefficients c_k (see
+    # get_diagonal_sums): a^H@Q@a = sum_k c_k*exp(1j*k*psi) with psi = kd*sin(DOA), so the FFT gives it on the uniform
+    # grid psi_p = 2*pi*p/n_fft, i.e. on a uniform sin(DOA) grid. It costs O(M^2 + n_fft*log(n_fft)) instead of O(M^2*n_DOA)
+    # Inputs:
+    # Q: np.array, (M',M') matrix (spatial correlation matrix, its inverse, a projector...)
+    # kd: float, product of the wavenumber k with the element distance d
+    # n_fft: int, FFT size (number of points of the uniform sin(DOA) grid over one period of psi), at least 2M'-1
+    # DOA_array: np.array, DOA grid (in degrees) used if interpolate is True. If None, we use the grid of the general configuration
+    # interpolate: bool, if True, the result is linearly interpolated onto the DOA grid. Else, it is returned on the uniform
+    # sin(DOA) grid
+    # transform: function, applied to a^H@Q@a after the interpolation (e.g. the spectrum np.real(1/a^H@Q@a)): the smooth
+    # polynomial a^H@Q@a is interpolated, not the spiky spectrum. If None, a^H@Q@a is returned
+    # rtol: float, maximum relative interpolation error on a^H@Q@a
+    # The linear interpolation error on a^H@Q@a is at most h^2/8*sum_k k^2*|c_k| (bound of the second derivative,
+    # h = 2*pi/n_fft). A spectrum 1/a^H@Q@a amplifies it by 1/min(a^H@Q@a): near the roots of a^H@Q@a (sharp MUSIC/EV
+    # peaks), or if a^H@Q@a is complex or not positive (non-Hermitian Q, e.g. the rotary averaged R, or indefinite Q),
+    # no interpolation is accurate. So if interpolate is True and the error bound is larger than rtol*min(a^H@Q@a) (or
+    # Q is not Hermitian), a^H@Q@a is evaluated exactly on the DOA grid from the c_k (see evaluate_diagonal_sums), in
+    # O(M*n_DOA) instead of O(n_fft*log(n_fft))
+    # Outputs:
+    # DOA_array: np.array, DOA (in degrees) where a^H@Q@a is given
+    # values: np.array, complex array containing a^H@Q@a for each DOA (or transform(a^H@Q@a))
+
+    M = Q.shape[-1]
+    if n_fft < 2*M-1:
+        raise ValueError('n_fft must be at least 2M-1 = {} (number of coefficients c_k), got n_fft = {}: the coefficients would alias'.format(2*M-1,n_fft))
+    c = get_diagonal_sums(Q)
+    if transform is None:
+        transform = lambda values: values
+
+    # Zero-padded coefficients: c_k is stored at index k modulo n_fft
+    b = np.zeros(c.shape[:-1]+(n_fft,),dtype=get_complex_dtype(c))
+    b[...,:M] = c[...,M-1:]
+    b[...,n_fft-(M-1):] = c[...,:M-1]
+
+    # sum_k b_k*exp(1j*2*pi*p*k/n_fft) = n_fft*ifft(b)[p]. We sort psi in [-pi,pi)
+    values = np.fft.fftshift(n_fft*np.fft.ifft(b,axis=-1),axes=-1)
+    psi = np.fft.fftshift(2*np.pi*np.fft.fftfreq(n_fft))
+
+    if not interpolate:
+        # We only keep the visible region |sin(DOA)| <= 1 (for kd > pi, one period of psi only covers |sin(DOA)| <= pi/kd,
+        # the other DOA are grating lobes of these ones)
+        visible = np.abs(psi) <= kd
+        return np.arcsin(psi[visible]/kd)*180/np.pi,transform(values[...,visible])
+
+    DOA_array = get_DOA_array(DOA_array)
+
+    # Q is Hermitian if and only if c_-k = conj(c_k), and then a^H@Q@a is real
+    hermitian = np.allclose(c[...,::-1].conj(),c)
+    error_bound = (2*np.pi/n_fft)**2/8*np.sum(np.arange(-(M-1),M)**2*np.abs(c),axis=-1)
+    if not hermitian or np.any(error_bound > rtol*np.min(values.real,axis=-1)) or np.any(np.min(values.real,axis=-1) <= 0):
+        A = get_steering_matrix(DOA_array=DOA_array,kd=kd,M=M,dtype=get_complex_dtype(c))
+        return DOA_array,transform(evaluate_diagonal_sums(c=c,A=A))
+
+    # psi of the requested DOA, wrapped in [-pi,pi) (grating lobes when kd > pi)
+    target = np.mod(kd*np.sin(DOA_array*np.pi/180)+np.pi,2*np.pi)-np.pi
+    # Linear interpolation between the two closest FFT points (psi is 2*pi periodic)
+    position = (target-psi[0])/(2*np.pi/n_fft)
+    index = np.floor(position).astype(int)
+    weight = position-index
+    values = np.concatenate((values,values[...,:1]),axis=-1)
+    index = np.clip(index,0,n_fft-1)
+
+    return DOA_array,transform((1-weight)*values[...,index]+weight*values[...,index+1])
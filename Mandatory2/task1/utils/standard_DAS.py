@@ -7,6 +7,8 @@
 import numpy as np
 from utils.general_functions import get_steering_vector
 from configuration import get_general_config
+from utils.spectrum_engine import get_DOA_array,get_steering_matrix,get_quadratic_forms,evaluate_spectrum_fft
+from utils.precision import get_complex_dtype
 
 def DAS_power_estimate(R:np.array,a:np.array)->float:
 
@@ -31,10 +33,45 @@ def DAS_power_estimate(R:np.array,a:np.array)->float:
    
     return float(np.abs(a.conj().T@R@a/a.shape[0]))
 
-def estimate_classical_spectrum(R:np.array,kd:float,M:int)->np.array:
+def estimate_classical_spectrum(R:np.array,kd:float,M:int,DOA_array:np.array=None)->np.array:
 
     # This function computes and returns the spectrum (for angles in [-40,50] degrees) using the standard DAS method
     # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # DOA_array: np.array, DOA grid (in degrees). If None, we use the grid of the general configuration
+    # Output:
+    # np.array, angular spectrum, or (K,n_DOA) array of angular spectra for a stack
+
+    # We compute the steering matrix for all the DOA at once
+    A = get_steering_matrix(DOA_array=get_DOA_array(DOA_array),kd=kd,M=M,dtype=get_complex_dtype(R))
+    # We compute all the power estimates a^H@R@a/M at once (see DAS_power_estimate)
+
+    return np.abs(get_quadratic_forms(Q=R,A=A))/R.shape[-1]
+
+def estimate_classical_spectrum_fft(R:np.array,kd:float,M:int,n_fft:int=2**14,DOA_array:np.array=None,interpolate:bool=True)->tuple:
+
+    # This function computes the DAS spectrum of a ULA with the FFT (see utils.spectrum_engine.evaluate_spectrum_fft)
+    # Inputs:
+    # R: np.array, spatial correlation matrix, or (K,M,M) stack of spatial correlation matrices
+    # kd: float, product of the wavenumber k with the element distance d
+    # M: int, number of sensors
+    # n_fft: int, FFT size
+    # DOA_array: np.array, DOA grid (in degrees) used if interpolate is True. If None, we use the grid of the general configuration
+    # interpolate: bool, if True, the spectrum is interpolated onto the DOA grid. Else, it is given on a uniform sin(DOA) grid
+    # Outputs:
+    # DOA_array: np.array, DOA (in degrees)
+    # np.array, angular spectrum, or (K,n_DOA) array of angular spectra for a stack
+
+    DOA_array,spectrum = evaluate_spectrum_fft(Q=R,kd=kd,n_fft=n_fft,DOA_array=DOA_array,interpolate=interpolate,transform=lambda values: np.abs(values)/R.shape[-1])
+
+    return DOA_array,spectrum
+
+def estimate_classical_spectrum_reference(R:np.array,kd:float,M:int)->np.array:
+
+    # This function is the per-DOA reference implementation of estimate_classical_spectrum
+    # Inputs:
     # R: np.array, spatial correlation matrix
     # kd: float, product of the wavenumber k with the element distance d
     # M: int, number of sensors
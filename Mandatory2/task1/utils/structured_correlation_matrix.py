@@ -0,0 +1,242 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains a spatial correlation matrix representation which knows its structure:
+# - 'hermitian': R = R^H, we store the M(M+1)/2 entries of the upper triangle (LAPACK packed storage)
+# - 'persymmetric': R = R^H and R = J@R^*@J (forward-backward averaged estimates), we only store about M^2/4 entries
+# - 'toeplitz': R[i,j] = c[i-j] (uncorrelated sources and a ULA), we store the M entries of the first column
+# The matrix-vector products and the solves use the packed BLAS/LAPACK routines (hermitian, persymmetric), or the FFT
+# and the Levinson recursion (toeplitz), without ever building the dense matrix
+
+from functools import lru_cache
+import numpy as np
+import scipy.linalg
+from scipy.linalg import blas,lapack
+from utils.spectrum_engine import get_diagonal_sums
+from utils.correlation_matrix_estimation import get_standard_correlation_matrix_estimation,forward_backward_average
+
+@lru_cache(maxsize=None)
+def get_packed_indices(M:int)->tuple:
+
+    # This function returns the (row,column) indices of the upper triangle in the LAPACK packed order (column by column:
+    # element i+j(j+1)/2 of the packed vector is R[i,j], i <= j)
+    # Input:
+    # M: int, number of sensors
+    # Outputs:
+    # rows: np.array, row indices
+    # columns: np.array, column indices
+
+    # tril_indices lists (j,i), i <= j, row by row, i.e. the upper triangle column by column
+    columns,rows = np.tril_indices(M)
+
+    return rows,columns
+
+@lru_cache(maxsize=None)
+def get_persymmetric_indices(M:int)->tuple:
+
+    # For a persymmetric Hermitian matrix, R[i,j] = R[M-1-j,M-1-i]: the packed entries come by pairs and we only store
+    # the ones with i+j <= M-1. This function returns the positions of the stored entries in the packed vector and, for
+    # all the packed entries, the position of the stored entry which has the same value
+    # Input:
+    # M: int, number of sensors
+    # Outputs:
+    # stored: np.array, positions (in the packed vector) of the stored entries
+    # expansion: np.array, expansion[p] is the position (in the stored vector) of the value of packed entry p
+
+    rows,columns = get_packed_indices(M)
+    stored = np.flatnonzero(rows+columns <= M-1)
+
+    # Packed position of each (i,j): i+j(j+1)/2
+    packed_position = lambda i,j: i+j*(j+1)//2
+    # Position in the stored vector of each packed position (-1 if the entry is not stored)
+    stored_position = np.full(len(rows),-1)
+    stored_position[stored] = np.arange(len(stored))
+    # The partner of (i,j) is (M-1-j,M-1-i): we keep the one which is stored
+    partner = packed_position(M-1-columns,M-1-rows)
+    expansion = np.where(stored_position >= 0,stored_position,stored_position[partner])
+
+    return stored,expansion
+
+class StructuredCorrelationMatrix:
+
+    # This class stores a spatial correlation matrix with its structure and provides fast matrix-vector products and solves
+    # Attributes:
+    # M: int, number of sensors
+    # structure: str, 'hermitian', 'persymmetric' or 'toeplitz'
+    # data: np.array, the stored (unique) entries: packed upper triangle ('hermitian'), half of it ('persymmetric')
+    # or first column ('toeplitz')
+
+    structures = ('hermitian','persymmetric','toeplitz')
+
+    def __init__(self,data:np.array,M:int,structure:str)->None:
+
+        # Inputs:
+        # data: np.array, the stored entries (see the attributes)
+        # M: int, number of sensors
+        # structure: str, 'hermitian', 'persymmetric' or 'toeplitz'
+
+        if structure not in self.structures:
+            raise ValueError('Unknown structure {}, the available structures are {}'.format(structure,self.structures))
+
+        self.data = np.asarray(data,dtype=complex)
+        self.M = M
+        self.structure = structure
+        # Packed Cholesky factor, computed at the first solve
+        self.cholesky_factor = None
+
+    @classmethod
+    def from_matrix(cls,R:np.array,structure:str='hermitian'):
+
+        # This function builds the structured representation of a dense spatial correlation matrix. R is first projected
+        # onto the structure: Hermitian part, forward-backward average (persymmetric) or diagonal average (toeplitz)
+        # Inputs:
+        # R: np.array, (M,M) spatial correlation matrix
+        # structure: str, 'hermitian', 'persymmetric' or 'toeplitz'
+        # Output:
+        # StructuredCorrelationMatrix
+
+        M = R.shape[-1]
+
+        if structure == 'toeplitz':
+            # c_k = mean of the k-th sub-diagonal (and of the conjugate of the k-th super-diagonal)
+            sums = get_diagonal_sums(R)
+            k = np.arange(M)
+            data = (sums[M-1-k]+np.conj(sums[M-1+k]))/(2*(M-k))
+            return cls(data=data,M=M,structure=structure)
+
+        R = 1/2*(R+R.conj().T)
+        if structure == 'persymmetric':
+            R = forward_backward_average(R)
+        rows,columns = get_packed_indices(M)
+        data = R[rows,columns]
+        if structure == 'persymmetric':
+            stored,_ = get_persymmetric_indices(M)
+            data = data[stored]
+
+        return cls(data=data,M=M,structure=structure)
+
+    @classmethod
+    def from_data(cls,Y:np.array,structure:str='hermitian'):
+
+        # This function estimates the spatial correlation matrix of a signal matrix and stores it with its structure.
+        # For the persymmetric structure, it is the forward-backward estimate
+        # Inputs:
+        # Y: np.array, signal matrix
+        # structure: str, 'hermitian', 'persymmetric' or 'toeplitz'
+        # Output:
+        # StructuredCorrelationMatrix
+
+        return cls.from_matrix(R=get_standard_correlation_matrix_estimation(Y=Y),structure=structure)
+
+    def get_packed(self)->np.array:
+
+        # This function returns the packed upper triangle (LAPACK packed storage) of a hermitian or persymmetric matrix
+        # Output:
+        # np.array, (M(M+1)/2,) packed upper triangle
+
+        if self.structure == 'persymmetric':
+            _,expansion = get_persymmetric_indices(self.M)
+            return self.data[expansion]
+
+        return self.data
+
+    def to_dense(self)->np.array:
+
+        # This function returns the dense matrix
+        # Output:
+        # R: np.array, (M,M) spatial correlation matrix
+
+        if self.structure == 'toeplitz':
+            return scipy.linalg.toeplitz(self.data,self.data.conj())
+
+        rows,columns = get_packed_indices(self.M)
+        packed = self.get_packed()
+        R = np.zeros((self.M,self.M),dtype=complex)
+        R[columns,rows] = packed.conj()
+        R[rows,columns] = packed
+
+        return R
+
+    def get_inverse(self)->np.array:
+
+        # This function returns the dense inverse of R. For a Toeplitz matrix, we use the Trench recursion (the
+        # Gohberg-Semencul formula written entry by entry): with x = R^-1@e_0 (one Levinson solve),
+        # R^-1[i,j] = R^-1[i-1,j-1] + (x_i*conj(x_j) - conj(x_{M-i})*x_{M-j})/x_0, so the inverse costs O(M^2)
+        # instead of O(M^3)
+        # Output:
+        # np.array, (M,M) inverse of R
+
+        if self.structure != 'toeplitz':
+            return np.linalg.inv(self.to_dense())
+
+        M = self.M
+        e_0 = np.zeros(M,dtype=complex)
+        e_0[0] = 1
+        x = self.solve(e_0)
+        # x_0 = R^-1[0,0] is real for a Hermitian matrix: we drop the rounding errors imaginary part
+        x_0 = np.real(x[0])
+
+        inverse = np.zeros((M,M),dtype=complex)
+        # First column x and first row x^H (R^-1 is Hermitian)
+        inverse[:,0] = x
+        inverse[0,:] = x.conj()
+        j = np.arange(1,M)
+        for i in range(1,M):
+            # Row i from row i-1, shifted along the diagonals
+            inverse[i,1:] = inverse[i-1,:-1]+(x[i]*x[j].conj()-x[M-i].conj()*x[M-j])/x_0
+
+        return inverse
+
+    def matvec(self,x:np.array)->np.array:
+
+        # This function computes R@x
+        # Input:
+        # x: np.array, (M,) vector or (M,n) matrix
+        # Output:
+        # np.array, R@x
+
+        x = np.asarray(x,dtype=complex)
+
+        if self.structure == 'toeplitz':
+            # R is the upper left block of the 2M circulant matrix with first column [c, 0, conj(c_{M-1}),...,conj(c_1)]:
+            # the product is a circular convolution, computed with the FFT in O(M*log(M))
+            circulant = np.concatenate((self.data,[0],np.flip(self.data[1:]).conj()))
+            X = np.fft.fft(x,n=2*self.M,axis=0)
+            eigenvalues = np.fft.fft(circulant)
+            if x.ndim == 2:
+                eigenvalues = eigenvalues[:,np.newaxis]
+            return np.fft.ifft(eigenvalues*X,axis=0)[:self.M]
+
+        # Packed Hermitian matrix-vector product (zhpmv), column by column for a matrix
+        packed = self.get_packed()
+        if x.ndim == 1:
+            return blas.zhpmv(self.M,1,packed,x)
+
+        return np.stack([blas.zhpmv(self.M,1,packed,x[:,n]) for n in range(x.shape[1])],axis=1)
+
+    def solve(self,b:np.array)->np.array:
+
+        # This function solves R@x = b
+        # Input:
+        # b: np.array, (M,) vector or (M,n) matrix
+        # Output:
+        # x: np.array, solution with the shape of b
+
+        b = np.asarray(b,dtype=complex)
+
+        if self.structure == 'toeplitz':
+            # Levinson recursion, O(M^2)
+            return scipy.linalg.solve_toeplitz((self.data,self.data.conj()),b)
+
+        # Packed Cholesky factorization (zpptrf), computed once
+        if self.cholesky_factor is None:
+            factor,info = lapack.zpptrf(self.M,self.get_packed())
+            if info != 0:
+                # R is not positive definite (e.g. diagonally reduced): dense LU solve
+                return np.linalg.solve(self.to_dense(),b)
+            self.cholesky_factor = factor
+
+        x,_ = lapack.zpptrs(self.M,self.cholesky_factor,b.reshape(self.M,-1))
+
+        return x.reshape(b.shape)
@@ -0,0 +1,129 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains the Subspace class: the eigendecomposition of a spatial correlation matrix, computed once
+# and shared by all the subspace methods (MUSIC, EV, eigenvalues plots...)
+
+import numpy as np
+from utils.precision import to_precision
+
+class Subspace:
+
+    # This class computes and stores the eigendecomposition of a spatial correlation matrix R
+    # Attributes:
+    # eigenvalues: np.array, eigenvalues sorted in descending order
+    # eigenvectors: np.array, associated eigenvectors (columns), sorted the same way
+    # hermitian: bool, True if R is Hermitian and the Hermitian solver (eigh) was used
+
+    def __init__(self,R:np.array)->None:
+
+        # Inputs:
+        # R: np.array, spatial correlation matrix
+
+        # All the spatial correlation matrix estimates are Hermitian except the rotary averaged one
+        self.hermitian = bool(np.allclose(R,np.swapaxes(R,-1,-2).conj()))
+
+        if self.hermitian:
+            # eigh returns real eigenvalues in ascending order
+            eigenvalues,eigenvectors = np.linalg.eigh(R)
+        else:
+            # General solver: the eigenvalues contain an imaginary part, we drop it (as in the per-DOA functions)
+            eigenvalues,eigenvectors = np.linalg.eig(R)
+            eigenvalues = np.real(eigenvalues)
+            order = np.argsort(eigenvalues,axis=-1)
+            eigenvalues = np.take_along_axis(eigenvalues,order,axis=-1)
+            eigenvectors = np.take_along_axis(eigenvectors,order[...,np.newaxis,:],axis=-1)
+
+        # We reverse the order to get the eigenvalues in descending order
+        self.eigenvalues = np.flip(eigenvalues,axis=-1)
+        self.eigenvectors = np.flip(eigenvectors,axis=-1)
+
+    @classmethod
+    def from_data(cls,Y:np.array,precision:str=None):
+
+        # This function computes the eigendecomposition of R = Y@Y^H/N directly from the signal matrix, without forming R
+        # (square-root estimator): with the SVD Y/sqrt(N) = U@S@V^H, R = U@S^2@U^H, so the eigenvectors are the left
+        # singular vectors and the eigenvalues the squared singular values. The SVD works on Y, whose condition number
+        # is the square root of the one of R, so the small (noise) eigenvalues are much more accurate
+        # Inputs:
+        # Y: np.array, (M,N) signal matrix, or (K,M,N) stack of signal matrices
+        # precision: str, 'double' or 'single' (see utils.precision). If None, we use the precision of the general configuration
+        # Output:
+        # Subspace
+
+        Y = to_precision(Y,precision=precision)
+        M,N = Y.shape[-2:]
+
+        subspace = cls.__new__(cls)
+        subspace.hermitian = True
+        # If N < M, the thin SVD only gives N left singular vectors: we need the full U for the noise subspace (the
+        # other eigenvalues are 0). Else, the thin SVD already gives the M eigenvectors (and no NxN matrix V)
+        U,singular_values,_ = np.linalg.svd(Y/np.sqrt(N),full_matrices=N < M)
+        # The singular values are already sorted in descending order
+        eigenvalues = singular_values**2
+        if N < M:
+            # The M-N missing eigenvalues are 0, but the EV spectrum divides by the noise eigenvalues: we floor them at
+            # the smallest computed eigenvalue (as for the other noise eigenvalues, R is only known up to the noise level)
+            eigenvalues = np.concatenate((eigenvalues,np.repeat(eigenvalues[...,-1:],M-N,axis=-1)),axis=-1)
+        subspace.eigenvalues = eigenvalues
+        subspace.eigenvectors = U
+
+        return subspace
+
+    def get_signal_subspace(self,Ns:int)->tuple:
+
+        # This function returns the signal subspace
+        # Input:
+        # Ns: int, number of sources
+        # Outputs:
+        # eigenvalues: np.array, the Ns largest eigenvalues
+        # eigenvectors: np.array, the Ns associated eigenvectors
+
+        return self.eigenvalues[...,:Ns],self.eigenvectors[...,:,:Ns]
+
+    def get_noise_subspace(self,Ns:int)->tuple:
+
+        # This function returns the noise subspace
+        # Input:
+        # Ns: int, number of sources
+        # Outputs:
+        # eigenvalues: np.array, the M-Ns smallest eigenvalues
+        # eigenvectors: np.array, the M-Ns associated eigenvectors
+
+        return self.eigenvalues[...,Ns:],self.eigenvectors[...,:,Ns:]
+
+    def get_projections(self,A:np.array)->np.array:
+
+        # This function computes the squared magnitude of the projections of the steering vectors on each eigenvector
+        # Input:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Output:
+        # np.array, (M',n_DOA) array, element (i,j) is |e_i^H@a_j|^2
+
+        # If we do spatial smoothing, we get rid of the last elements of the steering vectors such that shapes fit
+        A = A[:self.eigenvectors.shape[-2]]
+
+        return np.abs(np.swapaxes(self.eigenvectors,-1,-2).conj()@A)**2
+
+    def get_music_projections(self,A:np.array,Ns:int)->np.array:
+
+        # This function computes a^H@En@En^H@a for all the columns of the steering matrix A
+        # Inputs:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Ns: int, number of sources
+        # Output:
+        # np.array, (n_DOA,) array
+
+        return np.sum(self.get_projections(A)[...,Ns:,:],axis=-2)
+
+    def get_eigenvector_projections(self,A:np.array,Ns:int)->np.array:
+
+        # This function computes a^H@En@Lambda^-1@En^H@a for all the columns of the steering matrix A
+        # Inputs:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Ns: int, number of sources
+        # Output:
+        # np.array, (n_DOA,) array
+
+        return np.sum(self.get_projections(A)[...,Ns:,:]/self.eigenvalues[...,Ns:,np.newaxis],axis=-2)
@@ -0,0 +1,207 @@
+# IN5450 Mandatory 2
+# Thomas Aussaguès, 14/03/2022
+# thomas.aussagues@imt-atlantique.net
+
+# This script contains a recursive subspace tracker (PASTd, projection approximation subspace tracking with deflation):
+# the signal subspace is updated at each new snapshot in O(M*Ns), instead of an O(M^3) eigendecomposition of R.
+# The tracker has the interface of utils.subspace.Subspace (eigenvalues, eigenvectors, hermitian, get_signal_subspace,
+# get_noise_subspace, get_projections...), so it can be given to all the functions taking a subspace argument, e.g.
+# estimate_music_spectrum(R=None,kd=kd,M=M,Ns=Ns,subspace=tracker), the *_fft variants, estimate_all_spectra
+
+import numpy as np
+
+class SubspaceTracker:
+
+    # This class tracks the Ns dominant eigenvectors and eigenvalues of the (exponentially weighted) spatial
+    # correlation matrix, and the noise power (mean of the M-Ns smallest eigenvalues), with the PASTd algorithm
+    # Attributes:
+    # M: int, number of sensors
+    # Ns: int, number of tracked eigenvectors (number of sources)
+    # forgetting_factor: float, exponential forgetting factor beta in (0,1]
+    # W: np.array, (M,Ns) tracked eigenvectors (columns), approximately orthonormal, sorted by decreasing eigenvalue
+    # d: np.array, (Ns,) weighted sums of the powers |w_i^H@x|^2 (eigenvalues up to the normalization)
+    # noise_sum: float, weighted sum of the residual powers per noise dimension
+    # weight: float, sum of the weights of the snapshots (effective number of snapshots)
+    # n_snapshots: int, number of snapshots received so far
+    # hermitian: bool, always True (the tracked eigenvectors are orthonormalized, as the ones of a Hermitian R)
+
+    def __init__(self,M:int,Ns:int,forgetting_factor:float=0.99,initial_eigenvectors:np.array=None)->None:
+
+        # Inputs:
+        # M: int, number of sensors
+        # Ns: int, number of sources
+        # forgetting_factor: float, exponential forgetting factor beta in (0,1]
+        # initial_eigenvectors: np.array, (M,Ns) initial subspace (e.g. from a Subspace of a first block). If None,
+        # we start from the Ns first columns of the identity
+
+        if not 0 < forgetting_factor <= 1:
+            raise ValueError('The forgetting factor must be in (0,1]')
+        if not 0 < Ns < M:
+            raise ValueError('The number of tracked eigenvectors must be in [1,M-1]')
+
+        self.M = M
+        self.Ns = Ns
+        self.forgetting_factor = forgetting_factor
+        if initial_eigenvectors is None:
+            self.W = np.identity(M,dtype=complex)[:,:Ns]
+        else:
+            self.W = np.array(initial_eigenvectors,dtype=complex)
+        # Tiny initial powers such that the first update does not divide by zero
+        self.d = np.full(Ns,np.finfo(float).eps)
+        self.noise_sum = 0.
+        self.weight = 0.
+        self.n_snapshots = 0
+        self.hermitian = True
+
+    def update(self,Y:np.array)->None:
+
+        # This function updates the tracked subspace with new snapshots (one PASTd step per snapshot)
+        # Input:
+        # Y: np.array, (M,n) signal matrix of the new snapshots (a (M,) snapshot is also accepted)
+
+        Y = np.asarray(Y)
+        if Y.ndim == 1:
+            Y = Y[:,np.newaxis]
+        beta = self.forgetting_factor
+
+        for n in range(Y.shape[1]):
+            x = Y[:,n].astype(complex)
+            # Deflation: eigenvector i is updated with the part of x not explained by the eigenvectors 0,...,i-1
+            for i in range(self.Ns):
+                w = self.W[:,i]
+                y = np.vdot(w,x)
+                self.d[i] = beta*self.d[i]+np.abs(y)**2
+                # Projection approximation: w <- w + (x - w*y)*y^*/d
+                w += (x-w*y)*(np.conj(y)/self.d[i])
+                x = x-w*y
+            # What is left of x lies (approximately) in the noise subspace of dimension M-Ns
+            self.noise_sum = beta*self.noise_sum+np.real(np.vdot(x,x))/(self.M-self.Ns)
+            self.weight = beta*self.weight+1
+            self.n_snapshots += 1
+
+        return None
+
+    @property
+    def eigenvalues(self)->np.array:
+
+        # Tracked eigenvalues: the Ns signal eigenvalues, then the noise power for the M-Ns noise eigenvalues
+        # (same layout as Subspace.eigenvalues)
+
+        weight = max(self.weight,1.)
+
+        return np.concatenate((self.d/weight,np.full(self.M-self.Ns,self.noise_sum/weight)))
+
+    def get_noise_power(self)->float:
+
+        # This function returns the noise power estimate
+        # Output:
+        # float, mean of the noise eigenvalues
+
+        return self.noise_sum/max(self.weight,1.)
+
+    def get_orthonormal_basis(self,Ns:int)->np.array:
+
+        # PASTd only keeps W approximately orthonormal: this function orthonormalizes its Ns first columns with a QR
+        # decomposition (O(M*Ns^2)). The QR keeps the order of the columns, so the first i columns of the basis span
+        # the first i tracked eigenvectors
+        # Input:
+        # Ns: int, number of columns
+        # Output:
+        # np.array, (M,Ns) orthonormal basis
+
+        if Ns > self.Ns:
+            raise ValueError('Only {} eigenvectors are tracked'.format(self.Ns))
+        Q,_ = np.linalg.qr(self.W[:,:Ns])
+
+        return Q
+
+    @property
+    def eigenvectors(self)->np.array:
+
+        # Tracked eigenvectors completed into an orthonormal basis of C^M (same layout as Subspace.eigenvectors): the
+        # complete QR decomposition of W gives the orthonormalized tracked eigenvectors in its Ns first columns and an
+        # orthonormal basis of their orthogonal complement (the untracked noise subspace) in the M-Ns other ones
+
+        Q,_ = np.linalg.qr(self.W,mode='complete')
+
+        return Q
+
+    def get_noise_subspace(self,Ns:int)->tuple:
+
+        # This function returns the noise subspace (same as Subspace.get_noise_subspace): the tracked eigenvectors
+        # beyond Ns and the orthogonal complement of the tracked subspace
+        # Input:
+        # Ns: int, number of sources (at most the number of tracked eigenvectors)
+        # Outputs:
+        # eigenvalues: np.array, the M-Ns smallest eigenvalues
+        # eigenvectors: np.array, (M,M-Ns) associated eigenvectors
+
+        if Ns > self.Ns:
+            raise ValueError('Only {} eigenvectors are tracked'.format(self.Ns))
+
+        return self.eigenvalues[Ns:],self.eigenvectors[:,Ns:]
+
+    def get_projections(self,A:np.array)->np.array:
+
+        # This function computes |e_i^H@a|^2 for all the vectors e_i of the basis (see eigenvectors) and all the columns
+        # of A (same as Subspace.get_projections)
+        # Input:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Output:
+        # np.array, (M,n_DOA) array
+
+        return np.abs(self.eigenvectors.conj().T@A[:self.M])**2
+
+    def get_signal_subspace(self,Ns:int)->tuple:
+
+        # This function returns the signal subspace (same as Subspace.get_signal_subspace)
+        # Input:
+        # Ns: int, number of sources
+        # Outputs:
+        # eigenvalues: np.array, the Ns largest eigenvalues
+        # eigenvectors: np.array, the Ns associated eigenvectors
+
+        return self.eigenvalues[:Ns],self.get_orthonormal_basis(Ns=Ns)
+
+    def get_signal_projections(self,A:np.array)->np.array:
+
+        # This function computes |q_i^H@a|^2 for the tracked eigenvectors q_i and all the columns of A
+        # Input:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Output:
+        # np.array, (Ns,n_DOA) array
+
+        return np.abs(self.get_orthonormal_basis(Ns=self.Ns).conj().T@A[:self.M])**2
+
+    def get_music_projections(self,A:np.array,Ns:int)->np.array:
+
+        # This function computes a^H@En@En^H@a = ||a||^2 - ||Es^H@a||^2 for all the columns of the steering matrix A
+        # (En@En^H = I - Es@Es^H, so the noise subspace is never formed)
+        # Inputs:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Ns: int, number of sources (at most the number of tracked eigenvectors)
+        # Output:
+        # np.array, (n_DOA,) array
+
+        A = A[:self.M]
+        projections = self.get_signal_projections(A)
+
+        return np.sum(np.abs(A)**2,axis=0)-np.sum(projections[:Ns],axis=0)
+
+    def get_eigenvector_projections(self,A:np.array,Ns:int)->np.array:
+
+        # This function computes a^H@En@Lambda^-1@En^H@a for all the columns of the steering matrix A. The tracked
+        # eigenvectors beyond Ns are weighted by their eigenvalues, the untracked noise eigenvectors by the noise power
+        # Inputs:
+        # A: np.array, (M,n_DOA) steering matrix
+        # Ns: int, number of sources (at most the number of tracked eigenvectors)
+        # Output:
+        # np.array, (n_DOA,) array
+
+        A = A[:self.M]
+        projections = self.get_signal_projections(A)
+        eigenvalues = self.eigenvalues[:self.Ns,np.newaxis]
+        # Part of a in the untracked noise subspace
+        residual = np.sum(np.abs(A)**2,axis=0)-np.sum(projections,axis=0)
+
+        return np.sum(projections[Ns:]/eigenvalues[Ns:],axis=0)+residual/self.get_noise_power()